@@ -0,0 +1,230 @@
+'''
+Reproducible benchmark of the Solver strategies, to check any change of the search
+engines against a saved baseline:
+
+    python sampling/benchmark.py run --out baseline.json
+    ... change the engines ...
+    python sampling/benchmark.py run --out current.json
+    python sampling/benchmark.py compare baseline.json current.json
+
+The corpus only depends on the seed: for each generator (random, worst, duplicates)
+and size, a few instances. Each strategy is timed with perf_counter after warm-up
+runs, and reported by the median and interquartile range of the repeats; its peak
+memory is measured by tracemalloc in one more run, apart from the timed ones.
+compare exits with status 1 if a result changed or a strategy regressed.
+'''
+from time import perf_counter
+from random import Random
+import statistics
+import math
+import tracemalloc
+import platform
+import argparse
+import json
+
+# add package path
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.BridgeTorch import BridgeTorch
+from search.Solver import Solver
+from sampling.runner import genRandomInput, genWorstCaseInput, parseSizes
+
+
+# name: (algorithm, strategy, heuristic_id, options, largest size benchmarked)
+BENCHMARKS = {
+    'UCS': ('Graph', 'UCS', 1, {}, 12),
+    'A*': ('Graph', 'A*', 2, {}, 12),
+    'BFS': ('Graph', 'BFS', 1, {}, 12),
+    'DFS': ('Graph', 'DFS', 1, {}, 12),
+    'IDA*': ('Tree', 'IDA*', 2, {'transposition_size': 1 << 16}, 9),
+    'BB': ('Tree', 'BB', 2, {}, 8),
+    'BB+': ('Tree', 'BB+', 2, {}, 10),
+    'BiUCS': ('Graph', 'BiUCS', 1, {}, 12),
+    'DP': ('Exact', 'DP', 1, {}, 12),
+    'AWA*': ('Anytime', 'AWA*', 2, {'node_limit': 1 << 16}, 12),
+    'SMA*': ('Tree', 'SMA*', 2, {'memory_size': 1 << 12}, 9),
+    'HDA*': ('Parallel', 'HDA*', 2, {'workers': 2}, 12),
+}
+
+
+def genDuplicatesInput(rng, n):
+    '''
+    Walk times drawn among 3 values in 1 -> 100, random sides: many people share a
+    walk time, the case of BridgeTorch(symmetry=True)
+    '''
+    values = [rng.randrange(1, 101) for _ in range(3)]
+    durations = ' '.join(str(rng.choice(values)) for _ in range(n))
+    sides = [rng.randrange(0, 2) for _ in range(n)]
+    sides.append(rng.randrange(0, 2) if sum(sides) else 0)
+    return (durations, ' '.join(map(str, sides)))
+
+
+GENERATORS = {'random': genRandomInput, 'worst': genWorstCaseInput, 'duplicates': genDuplicatesInput}
+
+
+def makeCorpus(sizes, per_size, generators, seed=0):
+    '''
+    Return: instances (list of dict), each made from (seed, generator, size, index)
+    '''
+    corpus = []
+    for generator in generators:
+        for size in sizes:
+            for index in range(per_size):
+                rng = Random(f'{seed}/{generator}/{size}/{index}')
+                durations, init_state = GENERATORS[generator](rng, size)
+                corpus.append({'generator': generator, 'size': size, 'index': index,
+                               'durations': durations, 'init_state': init_state})
+    return corpus
+
+
+def percentile(values, q):
+    '''
+    Return: the q-quantile of values by linear interpolation, 0 <= q <= 1
+    '''
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def benchmarkOne(instance, name, repeat=5, warmup=1):
+    '''
+    Return: the result of strategy name on instance (dict): objective, expansion
+    counts, timings of the repeats and peak memory
+    '''
+    algorithm, strategy, heuristic_id, options, _ = BENCHMARKS[name]
+    def solve():
+        problem = BridgeTorch(instance['durations'], instance['init_state'])
+        solver = Solver(problem, algorithm, strategy, heuristic_id, **options)
+        start = perf_counter()
+        stats = solver.StatsSolve()
+        return perf_counter() - start, stats
+
+    for _ in range(warmup):
+        solve()
+    runs = []
+    for _ in range(repeat):
+        elapsed, (obj, _, time_complexity, max_space_complexity) = solve()
+        runs.append(elapsed)
+
+    tracemalloc.start()
+    try:
+        solve()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    q1, q3 = percentile(runs, 0.25), percentile(runs, 0.75)
+    return dict(instance, strategy=name, obj=obj, time_complexity=time_complexity,
+                max_space_complexity=max_space_complexity, runs=runs,
+                median=statistics.median(runs), q1=q1, q3=q3, iqr=q3 - q1, peak_memory=peak_memory)
+
+
+def Run(sizes, per_size, generators, strategies, seed=0, repeat=5, warmup=1):
+    '''
+    Return: the benchmark report (dict) with its settings in 'meta'
+    '''
+    results = []
+    for instance in makeCorpus(sizes, per_size, generators, seed):
+        for name in strategies:
+            if instance['size'] > BENCHMARKS[name][4]:
+                continue
+            result = benchmarkOne(instance, name, repeat, warmup)
+            results.append(result)
+            print(f"{instance['generator']} n={instance['size']} #{instance['index']} {name}: "
+                  f"{result['median'] * 1e3:.3f} ms (IQR {result['iqr'] * 1e3:.3f}), "
+                  f"{result['time_complexity']} nodes, {result['peak_memory']} B", flush=True)
+
+    meta = {'python': platform.python_version(), 'platform': platform.platform(), 'seed': seed,
+            'sizes': sizes, 'per_size': per_size, 'generators': generators, 'strategies': strategies,
+            'repeat': repeat, 'warmup': warmup}
+    return {'meta': meta, 'results': results}
+
+
+def Compare(baseline, current, threshold=0.1, min_time=1e-3):
+    '''
+    Parameters: baseline, current (dict): reports of Run, threshold (float): the
+    relative slow down tolerated, min_time (float): medians under it (seconds) are
+    too noisy to be flagged
+    Return    : the problems found (list of str)
+
+    A result is flagged if its objective changed, if it generates more nodes, if its
+    peak memory grew by more than threshold, or if its median time did and its
+    interquartile range is above the baseline's one. A summary per
+    strategy, the geometric mean of the time ratios, is printed
+    '''
+    key = lambda r: (r['generator'], r['size'], r['index'], r['strategy'], r['durations'], r['init_state'])
+    old = {key(r): r for r in baseline['results']}
+    problems = []
+    ratios = {}
+    for r in current['results']:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        label = f"{r['generator']} n={r['size']} #{r['index']} {r['strategy']}"
+        if r['obj'] != b['obj']:
+            problems.append(f"{label}: objective {b['obj']} -> {r['obj']}")
+        if r['time_complexity'] > b['time_complexity']:
+            problems.append(f"{label}: time complexity {b['time_complexity']} -> {r['time_complexity']}")
+        if r['median'] > b['median'] * (1 + threshold) and r['q1'] > b['q3'] and r['median'] >= min_time:
+            problems.append(f"{label}: median {b['median'] * 1e3:.3f} -> {r['median'] * 1e3:.3f} ms")
+        if r['peak_memory'] > b['peak_memory'] * (1 + threshold):
+            problems.append(f"{label}: peak memory {b['peak_memory']} -> {r['peak_memory']} B")
+        if b['median'] > 0 and r['median'] > 0:
+            ratios.setdefault(r['strategy'], []).append(r['median'] / b['median'])
+
+    for name, values in ratios.items():
+        print(f'{name}: {math.exp(statistics.mean(map(math.log, values))):.3f}x the baseline time over {len(values)} results')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Solver strategies.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run = commands.add_parser('run', help='benchmark the strategies on the seeded corpus')
+    run.add_argument('--sizes', default='4-10', help="input sizes, e.g. '4-10' or '4,8,12'")
+    run.add_argument('--per-size', type=int, default=3, help='instances per generator and size')
+    run.add_argument('--generators', default=','.join(GENERATORS), help='among ' + ', '.join(GENERATORS))
+    run.add_argument('--strategies', default='UCS,A*,BFS,DFS,IDA*,BB', help='among ' + ', '.join(BENCHMARKS))
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--repeat', type=int, default=5, help='timed runs of each result')
+    run.add_argument('--warmup', type=int, default=1, help='untimed runs before them')
+    run.add_argument('--out', default='benchmark.json')
+
+    compare = commands.add_parser('compare', help='flag the regressions of a report against a baseline')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.1, help='relative slow down tolerated')
+    compare.add_argument('--min-time', type=float, default=1e-3, help='seconds under which timings are not compared')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        generators, strategies = args.generators.split(','), args.strategies.split(',')
+        for name in generators:
+            if name not in GENERATORS:
+                parser.error(f'unknown generator {name}')
+        for name in strategies:
+            if name not in BENCHMARKS:
+                parser.error(f'unknown strategy {name}')
+        report = Run(parseSizes(args.sizes), args.per_size, generators, strategies, args.seed, args.repeat, args.warmup)
+        with open(args.out, 'w', encoding='UTF8') as f:
+            json.dump(report, f, indent=1)
+    else:
+        with open(args.baseline, encoding='UTF8') as f:
+            baseline = json.load(f)
+        with open(args.current, encoding='UTF8') as f:
+            current = json.load(f)
+        problems = Compare(baseline, current, args.threshold, args.min_time)
+        for problem in problems:
+            print('REGRESSION ' + problem)
+        print(f'{len(problems)} regression(s)')
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
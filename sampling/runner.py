@@ -0,0 +1,285 @@
+'''
+Parallel sampling of the search strategies, the successor of Test.Sampling:
+
+    python sampling/runner.py --sizes 4-12 --samples 100 --timeout 60
+
+Each (instance, strategy) pair is a job run by a pool of worker processes, with a
+Budget of the timeout and of the node limit (expanded nodes): the search stops
+itself when it runs out of either, and the job is kept as a censored result with
+the statistics so far. A worker still busy a few seconds after the timeout (a
+strategy without budget checks, or stuck in a long step) is killed and replaced. Every result is appended to the columnar store results/ (store.ResultStore) as
+soon as it is known, so an interrupted sweep continues where it stopped when run
+again with the same arguments. The jobs are made as they are run and the results
+are not kept in memory, which stays flat however many samples are taken. With
+--csv, the obj/runtime/timecplx/spacecplx CSVs of each size are also written from
+the store, with a status.csv telling which cells are censored.
+'''
+from multiprocessing.connection import wait
+from random import Random
+import multiprocessing
+import argparse
+import time
+import csv
+
+# add package path
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.BridgeTorch import BridgeTorch
+from search.Budget import Budget
+from search.Solver import Solver
+from sampling.store import ResultStore
+
+
+# column: (algorithm, strategy, heuristic_id, options)
+STRATEGIES = {
+    'UCS': ('Graph', 'UCS', 1, {}),
+    'BB': ('Tree', 'BB', 2, {}),
+    'BB+': ('Tree', 'BB+', 2, {}),
+    'A*': ('Graph', 'A*', 2, {}),
+    'IDA*': ('Tree', 'IDA*', 2, {'transposition_size': 1 << 16}),
+    'BFS': ('Graph', 'BFS', 1, {}),
+    'DFS': ('Graph', 'DFS', 1, {}),
+    'AWA*': ('Anytime', 'AWA*', 2, {'node_limit': 1 << 20}), # best plan within the budget
+}
+KILL_GRACE = 5 # seconds after the timeout before a worker is killed
+
+
+def genRandomInput(rng, n):
+    '''
+    Paramters: rng (Random), n (int), the number of people involved
+    Return   : A tuple of walk_time and initial state, which define an instance
+
+    Same distribution as Test.genRandomInput: walk times in 1 -> 100, random sides
+    and the candle on the side 0 if everybody is there
+    '''
+    durations = ' '.join(str(rng.randrange(1, 101)) for _ in range(n))
+    sides = [rng.randrange(0, 2) for _ in range(n)]
+    sides.append(rng.randrange(0, 2) if sum(sides) else 0)
+    return (durations, ' '.join(map(str, sides)))
+
+
+def genWorstCaseInput(rng, n):
+    '''
+    Same distribution as Test.genWorstCaseInput: walk times in 5 -> 50, everybody
+    and the candle on the side 0
+    '''
+    durations = ' '.join(str(rng.randrange(5, 51)) for _ in range(n))
+    return (durations, ' '.join(['0'] * (n + 1)))
+
+
+def makeJobs(sizes, n_samples, strategies, seed=0, worst_case=False):
+    '''
+    Return: jobs (generator of dict), the instance of each (size, sample) only
+    depends on the seed and the generator, so a sweep can be resumed or reproduced
+    '''
+    generator = 'worst' if worst_case else 'random'
+    for size in sizes:
+        for sample in range(n_samples):
+            rng = Random(f'{seed}/{size}/{sample}')
+            durations, init_state = genWorstCaseInput(rng, size) if worst_case else genRandomInput(rng, size)
+            for name in strategies:
+                yield {'size': size, 'sample': sample, 'strategy': name, 'seed': seed, 'generator': generator,
+                       'durations': durations, 'init_state': init_state}
+
+
+def findKey(job):
+    '''
+    Return: what identifies job in the store (tuple), its instance and strategy
+    '''
+    return (job['generator'], job['seed'], job['size'], job['sample'], job['strategy'])
+
+
+def runJob(job, timeout=None, max_nodes=None):
+    '''
+    Solve one job in the current process, within a Budget of timeout seconds and
+    max_nodes expanded nodes
+    Return: the job completed with its status and statistics (dict)
+    '''
+    algorithm, strategy, heuristic_id, options = STRATEGIES[job['strategy']]
+    problem = BridgeTorch(job['durations'], job['init_state'])
+    record = dict(job, obj=None, runtime=None, timecplx=None, spacecplx=None)
+    start = time.time()
+    try:
+        budget = Budget(time_limit=timeout, max_expansions=max_nodes)
+        result = Solver(problem, algorithm, strategy, heuristic_id, budget=budget, **options).Run()
+    except Exception as error:
+        record.update(status=f'error: {error}', runtime=time.time() - start)
+    else:
+        status = 'ok' if result.exceeded is None else f'budget exceeded ({result.exceeded})'
+        record.update(status=status, obj=result.cost, runtime=result.runtime,
+                      timecplx=result.time_complexity, spacecplx=result.max_space_complexity)
+    return record
+
+
+def work(conn, timeout, max_nodes):
+    '''
+    Loop of a worker process: receive a job, send back its record, until None
+    '''
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        conn.send(runJob(job, timeout, max_nodes))
+
+
+class Runner:
+    def __init__(self, out_dir, workers=None, timeout=60, max_nodes=None):
+        '''
+        Parameters: out_dir (str), workers (int): number of processes, the number
+        of CPUs by default, timeout (float): seconds per job, None for no limit,
+        max_nodes (int): expanded nodes per job, None for no limit
+        '''
+        self.out_dir = out_dir
+        self.store_path = os.path.join(out_dir, 'results')
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+
+
+    def findDone(self, store):
+        '''
+        Return: the jobs already in the store (set of tuples), read column by column
+        '''
+        rows = store.load(['generator', 'seed', 'size', 'instance', 'strategy'])
+        return set(zip(rows['generator'], rows['seed'], rows['size'], rows['instance'], rows['strategy']))
+
+
+    def Run(self, jobs):
+        '''
+        Parameters: jobs (iterable of dict) made by makeJobs
+        Return    : the number of jobs run
+
+        Run the jobs not already in the store, appending their results to it as
+        they complete
+        '''
+        os.makedirs(self.out_dir, exist_ok=True)
+        with ResultStore(self.store_path) as store:
+            done = self.findDone(store)
+            queue = (job for job in jobs if findKey(job) not in done)
+            count = 0
+
+            def save(record):
+                nonlocal count
+                count += 1
+                store.append({'instance': record['sample'], 'size': record['size'], 'seed': record['seed'],
+                              'generator': record['generator'], 'strategy': record['strategy'],
+                              'status': record['status'], 'cost': record['obj'], 'runtime': record['runtime'],
+                              'expansions': record['timecplx'], 'space': record['spacecplx']})
+                print(f"n={record['size']} #{record['sample']} {record['strategy']}: {record['status']}, "
+                      f"{record['runtime'] or 0:.3f}s", flush=True)
+
+            busy = {} # conn -> (process, job, deadline)
+            idle = []
+            job = next(queue, None)
+            try:
+                while job is not None or busy:
+                    while job is not None and len(busy) < self.workers:
+                        process, conn = idle.pop() if idle else self.startWorker()
+                        conn.send(job)
+                        deadline = time.time() + self.timeout + KILL_GRACE if self.timeout is not None else None
+                        busy[conn] = (process, job, deadline)
+                        job = next(queue, None)
+
+                    for conn in wait(list(busy), timeout=0.1):
+                        process, busy_job, _ = busy.pop(conn)
+                        try:
+                            save(conn.recv())
+                            idle.append((process, conn))
+                        except EOFError: # the worker died (e.g. out of memory)
+                            save(dict(busy_job, status='crashed', obj=None, runtime=None, timecplx=None, spacecplx=None))
+
+                    now = time.time()
+                    for conn, (process, busy_job, deadline) in list(busy.items()):
+                        if deadline is not None and now > deadline:
+                            process.terminate()
+                            process.join()
+                            del busy[conn]
+                            save(dict(busy_job, status='timeout', obj=None, runtime=self.timeout, timecplx=None, spacecplx=None))
+            finally:
+                for process, conn in idle:
+                    conn.send(None)
+                    process.join()
+                for process, _, _ in busy.values():
+                    process.terminate()
+        return count
+
+
+    def startWorker(self):
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=work, args=(child_conn, self.timeout, self.max_nodes), daemon=True)
+        process.start()
+        return process, conn
+
+
+    def writeData(self, header, seed=0, worst_case=False):
+        '''
+        Write size{n}/obj.csv, runtime.csv, timecplx.csv, spacecplx.csv and
+        status.csv from the store, one row per sample and one column per strategy
+        of header, one size at a time. A run stopped by its budget has no objective
+        but the statistics it reached, a killed one only its status and, for a
+        timeout, its runtime (the limit)
+        '''
+        columns = {'obj': 'cost', 'runtime': 'runtime', 'timecplx': 'expansions', 'spacecplx': 'space', 'status': 'status'}
+        with ResultStore(self.store_path) as store:
+            sizes = sorted(set(store.column('size')))
+            for size in sizes:
+                rows = store.load(['instance', 'strategy'] + list(columns.values()), size=size, seed=seed,
+                                  generator='worst' if worst_case else 'random')
+                samples = {}
+                for position, (sample, name) in enumerate(zip(rows['instance'], rows['strategy'])):
+                    samples.setdefault(sample, {})[name] = position
+                if not samples:
+                    continue
+
+                folder = os.path.join(self.out_dir, f'size{size}')
+                os.makedirs(folder, exist_ok=True)
+                for key, column in columns.items():
+                    values = rows[column]
+                    with open(os.path.join(folder, f'{key}.csv'), 'w', encoding='UTF8', newline='') as f:
+                        writer = csv.writer(f)
+                        writer.writerow(header)
+                        for sample in sorted(samples):
+                            positions = samples[sample]
+                            writer.writerow([values[positions[name]] if name in positions else None for name in header])
+
+
+def parseSizes(text):
+    '''
+    '4-12' -> [4, ..., 12], '4,6,8' -> [4, 6, 8]
+    '''
+    sizes = []
+    for part in text.split(','):
+        low, _, high = part.partition('-')
+        sizes.extend(range(int(low), int(high or low) + 1))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sample the search strategies on random instances.')
+    parser.add_argument('--sizes', default='4-12', help="input sizes, e.g. '4-12' or '4,8,12'")
+    parser.add_argument('--samples', type=int, default=100, help='instances per size')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help='columns to run, among ' + ', '.join(STRATEGIES))
+    parser.add_argument('--out', default=os.path.join('master', 'performance'), help='folder of the results')
+    parser.add_argument('--workers', type=int, default=None, help='processes, the number of CPUs by default')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per job, 0 for no limit')
+    parser.add_argument('--max-nodes', type=int, default=None, help='expanded nodes per job')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worst-case', action='store_true', help='everybody on the side 0, walk times in 5 -> 50')
+    parser.add_argument('--csv', action='store_true', help='also write the CSVs of each size from the store')
+    args = parser.parse_args(argv)
+
+    header = args.strategies.split(',')
+    for name in header:
+        if name not in STRATEGIES:
+            parser.error(f'unknown strategy {name}')
+
+    runner = Runner(args.out, args.workers, args.timeout or None, args.max_nodes)
+    runner.Run(makeJobs(parseSizes(args.sizes), args.samples, header, args.seed, args.worst_case))
+    if args.csv:
+        runner.writeData(header, args.seed, args.worst_case)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+'''
+Columnar store of sampling results, written row by row during a sweep and read
+back without parsing text:
+
+    store = ResultStore(os.path.join('master', 'performance', 'results'))
+    store.append({'instance': 0, 'size': 4, 'seed': 0, 'strategy': 'A*', 'cost': 17, ...})
+    store.close()
+
+    runtime = store.load(['instance', 'strategy', 'runtime'], size=9)   # dict of lists
+    values = numpy.frombuffer(store.column('runtime'))                 # zero copy
+
+The store is a folder with one file per column, its values end to end in little
+endian (int64 'q', -1 if missing, float64 'd', NaN if missing, or int32 codes of
+a string column), and schema.json with the columns and the strings of each
+string column. A row is written column by column, so a sweep killed in the
+middle of one leaves columns of different lengths: the shortest one gives the
+number of rows and the others are cut back to it when the store is opened again.
+'''
+from array import array
+import json
+import mmap
+import math
+import sys
+import os
+
+
+# name: type ('q' integer, 'd' float, 'str' string), in the order of the schema
+COLUMNS = {
+    'instance': 'q', # sample index of the instance within its size
+    'size': 'q',
+    'seed': 'q', # missing if the instances were not seeded
+    'generator': 'str', # 'random' or 'worst' (runner.py), 'sequential' (Test.Sampling)
+    'strategy': 'str',
+    'status': 'str',
+    'cost': 'q',
+    'runtime': 'd',
+    'expansions': 'q', # time complexity of the search
+    'space': 'q', # max space complexity of the search
+}
+# written for a missing value, which is loaded as None
+MISSING = {'q': -1, 'd': math.nan, 'str': ''}
+
+
+class ResultStore:
+    def __init__(self, path, flush_every=1):
+        '''
+        Parameters: path (str): folder of the store, created if needed, flush_every
+        (int): rows buffered before they are written, 1 so that a crash loses nothing
+        Attributes:
+        - self.rows (int): Number of rows written, the buffered ones not included
+        - self.labels (dict): Strings of each string column, a row holding the index
+        of its string
+        '''
+        self.path = path
+        self.flush_every = flush_every
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, 'schema.json')
+        if os.path.exists(schema_path):
+            with open(schema_path, encoding='UTF8') as f:
+                schema = json.load(f)
+            if schema['columns'] != [[name, kind] for name, kind in COLUMNS.items()]:
+                raise Exception(f'Invalid store! {path} was written with other columns.')
+            self.labels = schema['labels']
+        else:
+            self.labels = {name: [] for name, kind in COLUMNS.items() if kind == 'str'}
+            self.writeSchema()
+        self.codes = {name: {label: code for code, label in enumerate(labels)} for name, labels in self.labels.items()}
+
+        sizes = [os.path.getsize(self.findPath(name)) // array(self.findType(name)).itemsize
+                 if os.path.exists(self.findPath(name)) else 0 for name in COLUMNS]
+        self.rows = min(sizes)
+        self.files = {}
+        for name in COLUMNS: # cut back a row written in part
+            f = open(self.findPath(name), 'ab')
+            f.truncate(self.rows * array(self.findType(name)).itemsize)
+            self.files[name] = f
+        self.buffers = {name: array(self.findType(name)) for name in COLUMNS}
+        self.maps = {}
+
+
+    def findPath(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+
+    def findType(self, name):
+        '''
+        Return: typecode of the values of column name in its file (str)
+        '''
+        kind = COLUMNS[name]
+        return 'i' if kind == 'str' else kind
+
+
+    def writeSchema(self):
+        # replaced at once, so a crash leaves either schema
+        temp_path = os.path.join(self.path, 'schema.json.tmp')
+        with open(temp_path, 'w', encoding='UTF8') as f:
+            json.dump({'columns': [[name, kind] for name, kind in COLUMNS.items()], 'labels': self.labels}, f)
+        os.replace(temp_path, os.path.join(self.path, 'schema.json'))
+
+
+    def encode(self, name, label):
+        '''
+        Return: the code of label in the string column name, added to the schema
+        if new (int)
+        '''
+        code = self.codes[name].get(label)
+        if code is None:
+            code = self.codes[name][label] = len(self.labels[name])
+            self.labels[name].append(label)
+            self.writeSchema() # before any row holding the code
+        return code
+
+
+    def append(self, row):
+        '''
+        Parameters: row (dict): value of each column, None or absent if missing
+        '''
+        for name, kind in COLUMNS.items():
+            value = row.get(name)
+            if value is None:
+                value = MISSING[kind]
+            if kind == 'str':
+                value = self.encode(name, str(value))
+            self.buffers[name].append(value)
+        if len(self.buffers['instance']) >= self.flush_every:
+            self.flush()
+
+
+    def flush(self):
+        count = len(self.buffers['instance'])
+        if not count:
+            return
+        for name, buffer in self.buffers.items():
+            if sys.byteorder == 'big':
+                buffer.byteswap()
+            self.files[name].write(buffer.tobytes())
+            self.files[name].flush()
+            self.buffers[name] = array(buffer.typecode)
+        self.rows += count
+
+
+    def close(self):
+        self.flush()
+        for view, mapping in self.maps.values():
+            view.release()
+            if mapping is not None:
+                mapping.close()
+        self.maps = {}
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def __len__(self):
+        return self.rows + len(self.buffers['instance'])
+
+
+    def column(self, name):
+        '''
+        Return: the values of column name written so far, codes for a string column
+        (memoryview, or array on a big endian machine), mapped from its file: only
+        the pages read are loaded
+        '''
+        self.flush()
+        cached = self.maps.get(name)
+        if cached is not None and len(cached[0]) == self.rows:
+            return cached[0]
+        if cached is not None:
+            cached[0].release()
+            if cached[1] is not None:
+                cached[1].close()
+
+        typecode = self.findType(name)
+        size = self.rows * array(typecode).itemsize
+        if size == 0 or sys.byteorder == 'big': # nothing to map, or not in the native order
+            values = array(typecode)
+            with open(self.findPath(name), 'rb') as f:
+                values.frombytes(f.read(size))
+            if sys.byteorder == 'big':
+                values.byteswap()
+            view, mapping = memoryview(values), None
+        else:
+            with open(self.findPath(name), 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            view = memoryview(mapping).cast(typecode)
+        self.maps[name] = (view, mapping)
+        return view
+
+
+    def findRows(self, **where):
+        '''
+        Parameters: where: value, or collection of values, that column must have,
+        None for a missing value
+        Return    : the rows matching every condition (list of int)
+        '''
+        rows = None
+        for name, wanted in where.items():
+            if wanted is None or isinstance(wanted, (str, int, float)):
+                wanted = [wanted]
+            wanted = [MISSING[COLUMNS[name]] if value is None else value for value in wanted]
+            if COLUMNS[name] == 'str':
+                wanted = [self.codes[name][label] for label in wanted if label in self.codes[name]]
+            wanted = set(wanted)
+            values = self.column(name)
+            candidates = range(len(values)) if rows is None else rows
+            rows = [row for row in candidates if values[row] in wanted]
+        return list(range(self.rows)) if rows is None else rows
+
+
+    def load(self, columns=None, **where):
+        '''
+        Parameters: columns (list of str): all of them by default, where: as for
+        findRows, e.g. size=range(4, 14), strategy='A*'
+        Return    : the values of each column on the rows matching (dict of lists),
+        the strings decoded and the missing values None, ready for
+        pandas.DataFrame()
+        '''
+        rows = self.findRows(**where)
+        data = {}
+        for name in columns or COLUMNS:
+            values = self.column(name)
+            kind = COLUMNS[name]
+            if kind == 'str':
+                labels = self.labels[name]
+                data[name] = [labels[values[row]] for row in rows]
+            elif kind == 'd':
+                data[name] = [None if math.isnan(values[row]) else values[row] for row in rows]
+            else:
+                data[name] = [None if values[row] == -1 else values[row] for row in rows]
+        return data
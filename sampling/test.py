@@ -1,5 +1,4 @@
-from random import randrange
-import csv
+from random import Random
 
 # add package path
 import sys
@@ -8,8 +7,9 @@ sys.path.insert(0, os.getcwd())
 
 from search.BridgeTorch import BridgeTorch
 from search.Solver import Solver
+from sampling.store import ResultStore
 
-data_address = f'master\\performance\\' # address the folder to store the sampling data
+data_address = os.path.join('master', 'performance') # address the folder to store the sampling data
 
 
 def calculateAverage(num):
@@ -22,15 +22,22 @@ def calculateAverage(num):
 
 
 class Test:
-    def __init__(self, n_samples):
+    def __init__(self, n_samples, seed=None):
         self.n_samples = n_samples
-
-        self.objective = []
-        self.runtime = []
-        self.time_complexity = []
-        self.space_complexity = []
-
-        self.header = ['UCS', 'BB', 'A*', 'IDA*', 'BFS', 'DFS']
+        self.seed = seed if seed is not None else Random().randrange(1 << 31) # drawn, so the samples stay apart in the store
+        self.rng = Random(self.seed) # a seed makes the samples reproducible
+
+        self.header = ['UCS', 'BB', 'BB+', 'A*', 'IDA*', 'BFS', 'DFS']
+        # column: (algorithm, strategy, options, largest size sampled)
+        self.solvers = {
+            'UCS': ('Graph', 'UCS', {}, 13),
+            'BB': ('Tree', 'BB', {'heuristic_id': 2}, 10),
+            'BB+': ('Tree', 'BB+', {'heuristic_id': 2}, 12),
+            'A*': ('Graph', 'A*', {'heuristic_id': 2}, 13),
+            'IDA*': ('Tree', 'IDA*', {'heuristic_id': 2, 'transposition_size': 1 << 16}, 11),
+            'BFS': ('Graph', 'BFS', {}, 13),
+            'DFS': ('Graph', 'DFS', {}, 100),
+        }
     
 
     def genRandomInput(self, n):
@@ -42,19 +49,19 @@ class Test:
         inp_durations = ''
 
         for _ in range(n):
-            inp_duration = randrange(1, 101) # 1 -> 100
+            inp_duration = self.rng.randrange(1, 101) # 1 -> 100
             inp_durations += str(inp_duration) + ' '
         inp_durations = inp_durations.strip()
 
         inp_states = ''
         for _ in range(n):
-            inp_state = randrange(0, 2)
+            inp_state = self.rng.randrange(0, 2)
             inp_states += str(inp_state) + ' '
 
         if sum(list(map(int, inp_states.split()))) == 0:
             inp_states += '0'
         else:
-            candle = randrange(0, 2)
+            candle = self.rng.randrange(0, 2)
             inp_states += str(candle)
         
         return (inp_durations, inp_states)
@@ -69,7 +76,7 @@ class Test:
         inp_durations = ''
 
         for _ in range(n):
-            inp_duration = randrange(5, 51) # 5 -> 50
+            inp_duration = self.rng.randrange(5, 51) # 5 -> 50
             inp_durations += str(inp_duration) + ' '
         inp_durations = inp_durations.strip()
 
@@ -82,69 +89,33 @@ class Test:
         return (inp_durations, inp_states)
 
     
-    def writeData(self, inp_size, datatype): # file addresses depend on each personal device
-        if datatype == 'obj':
-            with open(data_address + f'size{inp_size}\\obj.csv', 'w', encoding='UTF8', newline='') as f:
-                writer = csv.writer(f)
-
-                # write the header
-                writer.writerow(self.header)
-
-                # write multiple rows
-                writer.writerows(self.objective)
-        
-        elif datatype == 'run':
-            with open(data_address + f'size{inp_size}\\runtime.csv', 'w', encoding='UTF8', newline='') as f:
-                writer = csv.writer(f)
-
-                # write the header
-                writer.writerow(self.header)
-
-                # write multiple rows
-                writer.writerows(self.runtime)
-
-        elif datatype == 'time':
-            with open(data_address + f'size{inp_size}\\timecplx.csv', 'w', encoding='UTF8', newline='') as f:
-                writer = csv.writer(f)
-
-                # write the header
-                writer.writerow(self.header)
-
-                # write multiple rows
-                writer.writerows(self.time_complexity)
-        
-        elif datatype == 'space':
-            with open(data_address + f'size{inp_size}\\spacecplx.csv', 'w', encoding='UTF8', newline='') as f:
-                writer = csv.writer(f)
-
-                # write the header
-                writer.writerow(self.header)
-
-                # write multiple rows
-                writer.writerows(self.space_complexity)
+    def writeData(self, store, inp_size, sample, name, stats): # one row, written as soon as it is known
+        obj, run, time, space = stats if stats is not None else [None, None, None, None]
+        store.append({'instance': sample, 'size': inp_size, 'seed': self.seed, 'generator': 'sequential', 'strategy': name,
+                      'status': 'ok' if stats is not None else 'skipped',
+                      'cost': obj, 'runtime': run, 'expansions': time, 'space': space})
     
 
     def Sampling(self, inp_size):
-        for i in range(self.n_samples):
-            durations, init_state = self.genRandomInput(inp_size)
-            problem = BridgeTorch(durations, init_state)
-            print(f'Instance n={inp_size}/[{durations}, {init_state}]: Testing')
-
-            obj0, run0, time0, space0 = Solver(problem, 'Graph', 'UCS').StatsSolve() if inp_size < 13 else [None, None, None, None]
-            #obj1, run1, time1, space1 = Solver(problem, 'Graph', 'A*').StatsSolve() if inp_size <= 13 else [None, None, None, None]
-            #obj2, run2, time2, space2 = Solver(problem, 'Tree', 'IDA*').StatsSolve() if inp_size < 10 else [None, None, None, None]
-            obj3, run3, time3, space3 = Solver(problem, 'Tree', 'BB', heuristic_id=2).StatsSolve() if inp_size <= 10 else [None, None, None, None]
-            obj4, run4, time4, space4 = Solver(problem, 'Graph', 'A*', heuristic_id=2).StatsSolve() if inp_size <= 13 else [None, None, None, None]
-            obj5, run5, time5, space5 = Solver(problem, 'Tree', 'IDA*', heuristic_id=2).StatsSolve() if inp_size <= 8 else [None, None, None, None]
-            obj6, run6, time6, space6 = Solver(problem, 'Graph', 'BFS').StatsSolve() if inp_size <= 13 else [None, None, None, None]
-            obj7, run7, time7, space7 = Solver(problem, 'Graph', 'DFS').StatsSolve() if inp_size <= 100 else [None, None, None, None]
-
-            self.objective.append([obj0, obj3, obj4, obj5, obj6, obj7])
-            self.runtime.append([run0, run3, run4, run5, run6, run7])
-            self.time_complexity.append([time0, time3, time4, time5, time6, time7])
-            self.space_complexity.append([space0, space3, space4, space5, space6, space7])
-
-        self.writeData(inp_size, datatype='obj')
-        self.writeData(inp_size, datatype='run')
-        self.writeData(inp_size, datatype='time')
-        self.writeData(inp_size, datatype='space')
\ No newline at end of file
+        '''
+        Sample n_samples instances of size inp_size, appended to the store. The
+        instances are drawn one after the other from the seed, so running the same
+        Test again (same seed, same sizes in the same order) draws the same ones, and
+        the strategies already stored for them are not run again
+        '''
+        with ResultStore(os.path.join(data_address, 'results')) as store:
+            rows = store.load(['instance', 'strategy'], seed=self.seed, generator='sequential', size=inp_size)
+            done = set(zip(rows['instance'], rows['strategy']))
+            for i in range(self.n_samples):
+                durations, init_state = self.genRandomInput(inp_size) # drawn even if done, for the next ones
+                if all((i, name) in done for name in self.header):
+                    continue
+                problem = BridgeTorch(durations, init_state)
+                print(f'Instance n={inp_size}/[{durations}, {init_state}]: Testing')
+
+                for name in self.header:
+                    if (i, name) in done:
+                        continue
+                    algorithm, strategy, options, largest = self.solvers[name]
+                    stats = Solver(problem, algorithm, strategy, **options).StatsSolve() if inp_size <= largest else None
+                    self.writeData(store, inp_size, i, name, stats)
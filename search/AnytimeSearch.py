@@ -0,0 +1,160 @@
+from .GraphSearch import GraphSearch, INF
+from .NodeArena import NodeArena
+from .Budget import BudgetExceeded
+
+from time import perf_counter
+import heapq
+
+
+class AnytimeSearch(GraphSearch):
+    def __init__(self, problem, weight=5, decay=0.5, time_limit=None, node_limit=None, **options):
+        '''
+        Parameters: problem (type Problem), weight (float): weight of the heuristic
+        until the first solution, decay (float): after each better solution the
+        weight becomes 1 + decay * (weight - 1), time_limit (float): seconds and
+        node_limit (integer): generated nodes the search may spend, None for no limit
+        Attributes:
+        - self.solutions (list): (seconds, cost, bound) of each better solution, in
+        the order found, bound being the proven ratio of its cost to the optimal one
+        - self.bound (float): Proven suboptimality of the last solution, 1 if optimal
+
+        Inherit from GraphSearch(), without closed set: a state keeps its best path
+        cost instead, and is reopened when reached more cheaply, since the weighted
+        order expands states before their cheapest path is known. A budget given to
+        the engine stops it like the limits above once a solution is known
+        '''
+        options['closed_set'] = None
+        GraphSearch.__init__(self, problem, **options)
+        self.weight = weight
+        self.decay = decay
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.bound = INF
+
+
+    def isExhausted(self, start):
+        '''
+        Return: whether the time or node budget is spent (boolean)
+        '''
+        if self.node_limit is not None and self.time_complexity >= self.node_limit:
+            return True
+        return self.time_limit is not None and perf_counter() - start >= self.time_limit
+
+
+    def updateBound(self, upper, expanding=INF):
+        '''
+        Parameters: upper (integer): the cost of the best solution, expanding
+        (integer): g + h of the node being expanded, whose children are not all in
+        the fringe yet
+        Return    : the proven suboptimality of the solution (float)
+
+        The lowest g + h of the fringe (and of that node) is a lower bound of the
+        optimal cost, the heuristic being admissible. Stale nodes and those not cheaper than upper are
+        dropped from the fringe on the way
+        '''
+        arena = self.arena
+        best_g = self.best_g
+        kept = []
+        lowest = min(upper, expanding)
+        for item in self.fringe:
+            index = item[2]
+            g = arena.g[index]
+            f = g + arena.h[index]
+            if g == best_g[arena.state[index]] and f < upper:
+                kept.append(item)
+                lowest = min(lowest, f)
+        self.fringe[:] = kept
+        self.bound = upper / lowest if lowest else (INF if upper else 1)
+        return self.bound
+
+
+    def AnytimeWeightedSearch(self, heuristic_id=2):
+        '''
+        Graph search using strategy Anytime weighted A* (priority g + weight * h): the
+        first solution comes quickly from the greedy order, then the search goes on
+        with the nodes which may still lead to a cheaper one (g + h below its cost),
+        each better solution lowering the weight, until the fringe is empty (the last
+        solution is optimal) or the budget is spent. After each solution, the lowest
+        g + h of the fringe bounds the optimal cost from below.
+        Return the best solution found, o.w return a failure
+        '''
+        problem = self.problem
+        instrument = self.instrument
+        arena = self.arena = NodeArena(problem)
+        fringe = self.fringe = [] # heap of (g + weight * h, -g, index), deepest first on ties
+        heappush, heappop, heapify = map(self.timeFrontier, (heapq.heappush, heapq.heappop, heapq.heapify))
+        best_g = self.best_g = {}
+        expanded = set()
+        weight = self.weight
+        upper = INF
+        incumbent = None
+        reopened = 0
+        start = perf_counter()
+
+        def improve(goal, expanding=INF):
+            nonlocal upper, incumbent, weight
+            upper = arena.g[goal]
+            incumbent = goal
+            weight = 1 + self.decay * (weight - 1)
+            self.solutions.append((perf_counter() - start, upper, self.updateBound(upper, expanding)))
+            for position, (_, tie, item) in enumerate(fringe):
+                fringe[position] = (arena.g[item] + weight * arena.h[item], tie, item)
+            heapify(fringe)
+
+        state = self.root_node.state
+        root = arena.add(state, -1, 0, 0, problem.findHeuristic(state, heuristic_id))
+        best_g[state] = 0
+        if problem.testGoal(state):
+            improve(root)
+        else:
+            heappush(fringe, (weight * arena.h[root], 0, root))
+
+        exceeded = None
+        expanding = INF
+        try:
+            while fringe and not self.isExhausted(start):
+                _, _, index = heappop(fringe)
+                state = arena.state[index]
+                g = arena.g[index]
+                if g > best_g[state] or g + arena.h[index] >= upper: # stale, or cannot beat the incumbent
+                    if instrument is not None and g > best_g[state]:
+                        instrument.emit('duplicate', state)
+                    continue
+
+                self.checkBudget()
+                if state in expanded:
+                    reopened += 1
+                expanded.add(state)
+                for action, result_state in problem.findSuccessorFn(state):
+                    self.time_complexity += 1
+                    path_cost = g + problem.findStepCost(action)
+                    if path_cost >= best_g.get(result_state, INF):
+                        if instrument is not None:
+                            instrument.emit('duplicate', result_state)
+                        continue
+                    h = problem.findChildHeuristic(state, arena.h[index], action, result_state, heuristic_id)
+                    if path_cost + h >= upper:
+                        continue
+                    best_g[result_state] = path_cost
+                    child = arena.add(result_state, index, action, path_cost, h)
+                    if problem.testGoal(result_state):
+                        improve(child, g + arena.h[index])
+                    else:
+                        heappush(fringe, (path_cost + weight * h, -path_cost, child))
+
+                self.space_complexity = len(arena)
+                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+        except BudgetExceeded as error: # the best solution so far is the answer
+            if incumbent is None:
+                raise
+            exceeded = str(error)
+            expanding = g + arena.h[index] # popped but not expanded
+
+        if incumbent is not None:
+            self.updateBound(upper, expanding)
+            self.result = arena.g[incumbent]
+            self.goal_index = incumbent
+        self.counters = {'Solutions': len(self.solutions), 'Suboptimality bound': self.bound, 'Reopened': reopened}
+        result = self.findResult()
+        result.exceeded = exceeded
+        return result
@@ -1,16 +1,26 @@
 from .Problem import Problem
-
-import itertools
-import bisect
+from .PatternDatabase import PatternDatabase, findProfile
+from .LRUCache import LRUCache
+from .Node import Node
+from .Root import Root
 
 
 class BridgeTorch(Problem):
-    def __init__(self, durations, init_state, objective=None):
+    def __init__(self, durations, init_state, objective=None, symmetry=False, pruning=False,
+                 memo_size=1 << 16):
         '''
         Model the problem Bridge and Torch follows 2 parameters:
         - durations  (list): Contain individuals' time taken to cross the bridge 
         - init_state (list): Contain binary elements which represent the place of
         individuals and the candle (the last element) at the moment
+        - symmetry (boolean): Treat people with the same duration as one class
+        - pruning (boolean): Skip the actions dominated by another one
+        - memo_size (integer): Number of heuristic values kept in self.heuristic_memo
+
+        States are packed into integers. The people are relabelled in ascending
+        order of duration, so bit r of a state is the place of the r-th fastest
+        person and bit n is the place of the candle. Lists are only decoded back
+        when the answer is printed.
         '''
         durations = list(map(int, durations.split()))
         init_state = list(map(int, init_state.split()))
@@ -18,103 +28,439 @@ class BridgeTorch(Problem):
             raise Exception('Invalid problem! Recheck the length of the two inputs.')
         
         self.durations = durations
-        self.init_state = init_state
-        self.goal = [1] * len(durations)
         self.objective = objective
 
+        n = len(durations)
+        self.order = sorted(range(n), key=lambda i: (durations[i], -init_state[i], i)) # rank -> person
+        self.walktimes = [durations[i] for i in self.order] # rank -> duration, ascending
+        self.bits = [0] * n # person -> bit of the state
+        for rank, person in enumerate(self.order):
+            self.bits[person] = 1 << rank
+
+        self.symmetry = symmetry
+        self.pruning = pruning
+        self.pruned_successors = 0
+        self.classes = [] # mask of the ranks of each class of people
+        for rank in range(n):
+            if rank and self.walktimes[rank] == self.walktimes[rank - 1]:
+                self.classes[-1] |= 1 << rank
+            else:
+                self.classes.append(1 << rank)
+
+        self.people = (1 << n) - 1 # everyone on the side 1
+        self.torch = 1 << n # the candle on the side 1
+        self.init_state = self.encodeState(init_state)
+        self.goal = self.people | self.torch
+        self.pattern_db = None # built on the first use of heuristic 3
+        self.fold_tables = None # built on the first use of heuristic 2
+        self.heuristic_memo = LRUCache(memo_size) # shared by every search on the instance
+
+
+    def setPatternDatabase(self, pattern_db=None, size=6):
+        '''
+        Parameters: pattern_db (PatternDatabase): a table to reuse, size (integer):
+        the number of slowest people in the pattern of a new table
+        Return    : the pattern database in use
+
+        Attach the table of heuristic 3, built for this instance unless one with the
+        same duration profile is given. The values of heuristic 3 memoized with
+        another table are forgotten
+        '''
+        if pattern_db is None:
+            pattern_db = PatternDatabase(findProfile(self.walktimes, size))
+        elif pattern_db.profile != findProfile(self.walktimes, len(pattern_db.profile[0]) - 2):
+            raise Exception('Invalid pattern database! Its duration profile differs from the instance.')
+
+        if pattern_db is not self.pattern_db and any(key & 3 == 3 for key in self.heuristic_memo.entries):
+            # the values of heuristic 3 were read from the former table
+            self.heuristic_memo = self.heuristic_memo.copy(lambda key: key & 3 != 3)
+        self.pattern_db = pattern_db
+        self.pattern_high = max(2, len(self.walktimes) - (len(pattern_db.profile[0]) - 2)) # rank of the first slow person
+        return pattern_db
+
+
+    def findCanonicalKey(self):
+        '''
+        Return: key (tuple), the same for the instances equal up to a permutation of
+        the people (and built with the same options). States and actions are in rank
+        space, so they mean the same for all of them
+        '''
+        return (tuple(self.walktimes), self.init_state, self.symmetry, self.pruning)
+
+
+    def findHeuristicTables(self):
+        '''
+        Return: walk times and tables of heuristics 2 and 3 built so far (tuple), all
+        that shareHeuristic needs, so keeping them does not keep the instance and
+        its memo
+        '''
+        return (tuple(self.walktimes), self.fold_tables, self.pattern_db)
+
+
+    def shareHeuristic(self, tables):
+        '''
+        Parameters: tables (tuple): findHeuristicTables() of an instance with the
+        same walk times
+
+        Heuristics only depend on the walk times and the state, so the tables of
+        another instance serve this one as they are. Each instance keeps its own memo
+        '''
+        walktimes, fold_tables, pattern_db = tables
+        if list(walktimes) != self.walktimes:
+            raise Exception('Invalid instance! Heuristics are only shared by the same walk times.')
+        if fold_tables is not None:
+            self.fold_tables = fold_tables
+        if pattern_db is not None:
+            self.setPatternDatabase(pattern_db)
+
+
+    def encodeState(self, state):
+        '''
+        Parameter: state (list)
+        Return   : packed state (integer)
+        '''
+        packed = self.torch if state[-1] else 0
+        for person, bit in enumerate(self.bits):
+            if state[person]:
+                packed |= bit
+        return packed
+
+
+    def decodeState(self, state):
+        '''
+        Parameter: Node.state (integer)
+        Return   : state (list)
+        '''
+        return [1 if state & bit else 0 for bit in self.bits] + [1 if state & self.torch else 0]
+
+
+    def rankState(self, state):
+        '''
+        Parameter: Node.state (integer)
+        Return   : index of the state in 0..countStates()-1 (integer)
+        '''
+        return state
+
+
+    def countStates(self):
+        return self.torch << 1
+
+
+    def decodeAction(self, action):
+        '''
+        Parameter: Node.action (integer)
+        Return   : crossers (list), the people crossing in ascending order
+        '''
+        crossers = []
+        while action:
+            low = action & -action
+            crossers.append(self.order[low.bit_length() - 1])
+            action ^= low
+        return sorted(crossers)
+
 
     def findSuccessorFn(self, state):
         '''
-        Parameter: Node.state (list)
+        Parameter: Node.state (integer)
         Return   : transitions (list)
 
         Search all the possible result states that can be reached using a simple
-        action from the current state 
+        action from the current state. An action is the mask of the people crossing
+        together with the candle
+        '''
+        if self.symmetry:
+            return self.findCanonicalSuccessorFn(state)
+
+        transitions = []
+        torch = self.torch
+
+        if state & torch: # the candle is on the side 1, one person walks it back
+            if self.pruning:
+                crossed = state & self.people
+                self.pruned_successors += bin(crossed).count('1') - 1
+                bit = crossed & -crossed # the fastest on the side 1
+                return [(bit, state ^ bit ^ torch)] if bit else []
+
+            for bit in self.bits:
+                if state & bit:
+                    transitions.append((bit, state ^ bit ^ torch)) # form of transition
+        else:
+            origin = [bit for bit in self.bits if not state & bit]
+            if len(origin) == 1:
+                transitions.append((origin[0], state | origin[0] | torch))
+            else:
+                lower, upper = self.findPruningWindow(state, len(origin))
+                walktimes = self.walktimes
+                for x in range(len(origin)):
+                    for y in range(x + 1, len(origin)):
+                        action = origin[x] | origin[y]
+                        if lower < walktimes[(action & -action).bit_length() - 1] <= upper:
+                            self.pruned_successors += 1
+                            continue
+                        transitions.append((action, state | action | torch))
+
+        return transitions
+
+
+    def findCanonicalSuccessorFn(self, state):
+        '''
+        Parameter: Node.state (integer)
+        Return   : transitions (list)
+
+        Same as findSuccessorFn but one action per class instead of per person:
+        the people of a class on the side 1 hold its lowest ranks, so the next one
+        to cross is just above them and the one to walk back is the highest of them
+        '''
+        transitions = []
+        torch = self.torch
+
+        if state & torch:
+            for members in self.classes:
+                crossed = state & members
+                if crossed:
+                    bit = 1 << (crossed.bit_length() - 1)
+                    transitions.append((bit, state ^ bit ^ torch))
+            if self.pruning and transitions: # classes go from the fastest
+                self.pruned_successors += len(transitions) - 1
+                del transitions[1:]
+        else:
+            origin = [] # first and second person of each class on the side 0
+            left = 0
+            for members in self.classes:
+                waiting = members & ~state
+                if waiting:
+                    first = waiting & -waiting
+                    origin.append((first, waiting & (first << 1)))
+                    left += bin(waiting).count('1')
+
+            if left == 1:
+                first = origin[0][0]
+                transitions.append((first, state | first | torch))
+            else:
+                lower, upper = self.findPruningWindow(state, left)
+                walktimes = self.walktimes
+                for x in range(len(origin)):
+                    first, second = origin[x]
+                    if lower < walktimes[first.bit_length() - 1] <= upper: # slower one goes with it
+                        self.pruned_successors += len(origin) - x - (0 if second else 1)
+                        continue
+                    if second:
+                        action = first | second
+                        transitions.append((action, state | action | torch))
+                    for y in range(x + 1, len(origin)):
+                        action = first | origin[y][0]
+                        transitions.append((action, state | action | torch))
+
+        return transitions
+
+
+    def findPredecessorFn(self, state):
+        '''
+        Parameter: Node.state (integer)
+        Return   : transitions (list) of (action, previous state)
+
+        Inverse of findSuccessorFn, for searching backward from the goal: every
+        (action, previous) such that the action leads from previous to state. The
+        last crossers are on the candle's side; with symmetry they are the people
+        at the canonical boundary of their class, and with pruning the actions the
+        successor function skips are skipped here too
         '''
-        cur_state = state[:]
         transitions = []
+        torch = self.torch
+        crossed = state & self.people
+        waiting = self.people & ~state
+
+        if state & torch: # the last trip went forward
+            if self.symmetry: # the highest people of each class on the side 1
+                origin = []
+                for members in self.classes:
+                    here = crossed & members
+                    if here:
+                        last = 1 << (here.bit_length() - 1)
+                        origin.append((last, here & (last >> 1)))
+            else:
+                origin = [(bit, 0) for bit in self.bits if crossed & bit]
+
+            if not waiting: # the previous state had a single person left on the side 0
+                for last, _ in origin:
+                    transitions.append((last, state ^ last ^ torch))
+            walktimes = self.walktimes
+            left = bin(waiting).count('1') + 2
+            for x in range(len(origin)):
+                first, second = origin[x]
+                pairs = [first | second] if second and self.symmetry else []
+                pairs += [first | origin[y][0] for y in range(x + 1, len(origin))]
+                for action in pairs:
+                    previous = state ^ action ^ torch
+                    lower, upper = self.findPruningWindow(previous, left)
+                    if not lower < walktimes[(action & -action).bit_length() - 1] <= upper:
+                        transitions.append((action, previous))
+        else: # the last trip went back
+            if self.symmetry: # the lowest person of each class on the side 0
+                origin = [(waiting & members) & -(waiting & members) for members in self.classes if waiting & members]
+            else:
+                origin = [bit for bit in self.bits if waiting & bit]
+
+            for bit in origin:
+                previous = state ^ bit ^ torch
+                if self.pruning: # only the fastest on the side 1 walks back
+                    back = previous & self.people
+                    fastest = back & -back
+                    if self.symmetry:
+                        if not any(members & bit and members & fastest for members in self.classes):
+                            continue
+                    elif fastest != bit:
+                        continue
+                transitions.append((bit, previous))
 
-        def Act(origin, goal):
-            if origin == 0 and len(cur_state) == sum(cur_state) + 2:
-                for person_z in range(len(cur_state) - 1):
-                    if cur_state[person_z] == origin:
-                        result_state = cur_state[:]
-                        result_state[person_z] = goal
-                        result_state[-1] = goal
-                        action = [[person_z], (origin, goal)] # form of action
-                        transitions.append((action, result_state)) # form of transition
-            
-            elif goal == 1:
-                candidates = itertools.combinations(list(range(len(self.durations))), 2)
-                for person_x, person_y in candidates:
-                    if cur_state[person_x] == origin and cur_state[person_y] == origin:
-                        result_state = cur_state[:]
-                        result_state[person_x] = goal
-                        result_state[person_y] = goal
-                        result_state[-1] = goal
-                        action = [[person_x, person_y], (origin, goal)] # form of action
-                        transitions.append((action, result_state)) # form of transition
-            elif goal == 0:
-                for person_z in range(len(cur_state) - 1):
-                    if cur_state[person_z] == origin:
-                        result_state = cur_state[:]
-                        result_state[person_z] = goal
-                        result_state[-1] = goal
-                        action = [[person_z], (origin, goal)] # form of action
-                        transitions.append((action, result_state)) # form of transition
-
-        Act(state[-1], abs(state[-1] - 1))
         return transitions
 
 
+    def findPruningWindow(self, state, left):
+        '''
+        Parameters: Node.state (integer) with the candle on the side 0, left (integer)
+        the number of people on the side 0
+        Return    : (lower, upper), a pair whose faster person a has lower < d(a) <= upper
+        is dominated
+
+        Rule 1 (walking back): only the fastest person on the side 1 walks back.
+        Moving the faster one back instead never costs more: the two swap roles
+        until they first meet on a side, which takes at most one trip of the
+        slower one.
+        Rule 2 (walking forward): if a would be the fastest on the side 1 after
+        crossing with b, rule 1 sends a straight back, so the pair only brings b
+        over at max(d(a), d(b)) + d(a). When f, the fastest on the side 0, is
+        faster than a, crossing with f and sending f back does the same for less.
+        Not applied to the last trip, which empties the side 0.
+        '''
+        if not self.pruning or left <= 2:
+            return float('inf'), float('inf')
+
+        waiting = self.people & ~state
+        crossed = state & self.people
+        lower = self.walktimes[(waiting & -waiting).bit_length() - 1]
+        upper = self.walktimes[(crossed & -crossed).bit_length() - 1] if crossed else float('inf')
+        return lower, upper
+
+
     def findStepCost(self, action):
         '''
-        Parameter: Node.action (list - list, tuple)
+        Parameter: Node.action (integer)
         Return   : cost (integer)
 
-        Find the cost of a single action following the rule of problem
+        Find the cost of a single action following the rule of problem. The slowest
+        crosser is the highest bit of the action
         '''
-        crossers = action[0]
-        if len(crossers) == 2:
-            person_x, person_y = crossers
-            cost = max(self.durations[person_x], self.durations[person_y])
-        else:
-            person_z = crossers[0]
-            cost = self.durations[person_z]
-        
-        return cost
+        return self.walktimes[action.bit_length() - 1]
 
 
     def findHeuristic(self, state, id=2):
         '''
-        Parameter: Node.state (list)
+        Parameter: Node.state (integer)
         Reuturn  : max_time (integer)
 
         1: Estimate the cost from the current state to the goal by the time to cross
         bridge of the slowest person on the side 0 at this moment
         2: Estimate the cost from the current state to the goal by the sum of the time 
         of each pair in side 0 crossing bridge
+        3: Exact cost of the pattern (the two fastest and the slowest people) read
+        from the pattern database, or heuristic 2 if it is higher
+
+        Values are memoized in self.heuristic_memo, a bounded LRU cache
+        '''
+        key = state << 2 | id
+        estimated = self.heuristic_memo.get(key)
+        if estimated is None:
+            estimated = self.computeHeuristic(state, id)
+            self.heuristic_memo.put(key, estimated)
+        return estimated
+
+
+    def findChildHeuristic(self, parent_state, parent_h, action, state, id=2):
+        '''
+        Parameters: parent's state (integer) and heuristic (integer), Node.action
+        (integer) leading to the child, child's state (integer)
+        Return    : the child's heuristic (integer)
+
+        Same as findHeuristic but heuristic 2 is updated from the parent's: the
+        people above the slowest crosser keep their place in the sorted remaining set,
+        so only the ranks below it are folded again
+        '''
+        key = state << 2 | id
+        estimated = self.heuristic_memo.get(key)
+        if estimated is None:
+            if id == 2:
+                top = action.bit_length()
+                low = (1 << top) - 1
+                parity = bin((self.people & ~parent_state) >> top).count('1') & 1
+                estimated = parent_h - self.foldWalktimes(~parent_state & low, parity) \
+                    + self.foldWalktimes(~state & low, parity)
+            else:
+                estimated = self.computeHeuristic(state, id)
+            self.heuristic_memo.put(key, estimated)
+        return estimated
+
+
+    def computeHeuristic(self, state, id=2):
         '''
+        Parameter: Node.state (integer)
+        Return   : heuristic (integer), not memoized
+        '''
+        remain = self.people & ~state # people on the side 0
         if id == 1:
-            people_pos = state[:-1]
-            max_time = 0
-            for i in range(len(people_pos)):
-                if people_pos[i] == 0:
-                    max_time = max(max_time, self.durations[i])
-        
-            return max_time
+            return self.walktimes[remain.bit_length() - 1] if remain else 0
         elif id == 2:
-            people_pos = state[:-1]
-            remain_walktime = []
-            for i in range(len(people_pos)):
-                if people_pos[i] == 0:
-                    bisect.insort(remain_walktime, self.durations[i])
+            return self.foldWalktimes(remain, 0)
+        elif id == 3:
+            if self.pattern_db is None:
+                self.setPatternDatabase()
+            index = (state & 3) | (state >> self.pattern_high << 2) # the candle comes along
+            return max(self.pattern_db.table[index], self.foldWalktimes(remain, 0))
+
+
+    def foldWalktimes(self, remain, parity):
+        '''
+        Parameters: remain (integer): mask of ranks, parity (integer): number of
+        people above them, modulo 2
+        Return    : sum of the durations at even places of the sorted remaining set
+
+        The ranks are read 8 at a time, slowest first, through tables giving the sum
+        at even and odd places of each byte
+        '''
+        if self.fold_tables is None:
+            self.buildFoldTables()
+        even, odd, flips = self.fold_tables
+
+        estimated = 0
+        chunk = (remain.bit_length() - 1) >> 3
+        while chunk >= 0:
+            byte = remain >> (chunk << 3) & 255
+            if byte:
+                estimated += odd[chunk][byte] if parity else even[chunk][byte]
+                parity ^= flips[byte]
+            chunk -= 1
+        return estimated
 
-            estimated = 0
-            l = len(remain_walktime)
-            for i in range(l-1, -1, -2):
-                estimated += remain_walktime[i]
-            return estimated
+
+    def buildFoldTables(self):
+        n = len(self.walktimes)
+        even, odd = [], []
+        flips = [bin(byte).count('1') & 1 for byte in range(256)]
+        for chunk in range((n + 7) >> 3):
+            even.append([0] * 256)
+            odd.append([0] * 256)
+            for byte in range(1, 256):
+                # the highest person of the byte is in place 0, the others move one place
+                top = byte.bit_length() - 1
+                rest = byte ^ (1 << top)
+                rank = (chunk << 3) + top
+                if rank < n:
+                    even[chunk][byte] = odd[chunk][rest] + self.walktimes[rank]
+                    odd[chunk][byte] = even[chunk][rest]
+                else: # nobody there
+                    even[chunk][byte] = even[chunk][rest]
+                    odd[chunk][byte] = odd[chunk][rest]
+        self.fold_tables = (even, odd, flips)
 
 
     def findSolution(self, node):
@@ -124,29 +470,68 @@ class BridgeTorch(Problem):
 
         Backtrack and return the status and the best method to cross the bridge
         '''
-        if node.state == self.init_state:
-            return '\nThe method:\n'
-        
-        start, end = node.action[1]
-        if len(node.action[0]) == 2:
-            person1, person2 = node.action[0]
-            if start == 0:
-                return self.findSolution(node.parent) + f'{person1+1} {person2+1} ->\n'
-            else:
-                return self.findSolution(node.parent) + f'{person1+1} {person2+1} <-\n'
-        elif len(node.action[0]) == 1:
-            person1 = node.action[0][0]
-            if start == 0:
-                return self.findSolution(node.parent) + f'{person1+1} ->\n'
-            else:
-                return self.findSolution(node.parent) + f'{person1+1} <-\n'
+        return self.findPlan(self.findActions(node))
+
+
+    def findActions(self, node):
+        '''
+        Parameter: node (type Node)
+        Return   : the actions from the root to the node (list)
+        '''
+        actions = []
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+
+    def findGoalNode(self, actions):
+        '''
+        Parameter: actions (list), as given by findActions
+        Return   : the node reached from the root by the actions (type Node)
+        '''
+        node = Root(self)
+        for action in actions:
+            node = Node(self, node.state ^ action ^ self.torch, node, action)
+        return node
+
+
+    def findPlan(self, actions, state=None):
+        '''
+        Parameter: actions (iterable of Node.action), state (integer): where they
+        start from, self.init_state by default
+        Return   : the method of findSolution for these actions (string)
+        '''
+        backward = (self.init_state if state is None else state) & self.torch
+        steps = []
+        for action in actions:
+            crossers = ' '.join(str(person + 1) for person in self.decodeAction(action))
+            steps.append(f"{crossers} {'<-' if backward else '->'}\n")
+            backward = not backward
+
+        return '\nThe method:\n' + ''.join(steps)
+
+
+    def findDepthBound(self, state):
+        '''
+        Parameter: Node.state (integer)
+        Return   : the fewest trips from state to the goal (integer): a trip forward
+        moves at most 2 people and each trip back brings at least 1 of them back
+        '''
+        left = bin(self.people & ~state).count('1') # people on the side 0
+        if not left:
+            return 0
+        if state & self.torch: # somebody brings the candle back first
+            return 2 * left
+        return 1 if left == 1 else 2 * left - 3
 
 
     def testGoal(self, state):
-        return state[:-1] == self.goal
+        return (state | self.torch) == self.goal
 
 
     def checkObjective(self, node):
         if self.objective == None:
             return 'No data'
-        return self.objective == node.path_cost
\ No newline at end of file
+        return self.objective == node.path_cost
@@ -0,0 +1,89 @@
+from time import perf_counter
+import threading
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class CancellationToken:
+    def __init__(self):
+        '''
+        Handle to stop a solve from another thread: cancel() makes the Budget holding
+        the token stop its search at the next check
+        '''
+        self.event = threading.Event()
+
+
+    def cancel(self):
+        self.event.set()
+
+
+    def isCancelled(self):
+        return self.event.is_set()
+
+
+class Budget:
+    def __init__(self, time_limit=None, max_expansions=None, max_space=None, token=None, check_every=128):
+        '''
+        Parameters: time_limit (float): seconds from the start of the search,
+        max_expansions (integer): nodes expanded, max_space (integer): space
+        complexity of the engine, i.e. the nodes held in its frontier and closed
+        set, token (CancellationToken), check_every (integer): expansions between
+        two checks of the clock, the token and the space. None for no limit
+        Attributes:
+        - self.expansions (integer): Nodes expanded by the search, as of the last check
+
+        Limits of a search engine built with GraphSearch(problem, budget=...), from
+        the call to start(). Every
+        strategy calls GraphSearch.checkBudget() for each node it expands, which only
+        counts down: the limits are checked when the count reaches zero, and
+        BudgetExceeded is raised with the limit hit ('cancelled', 'deadline',
+        'expansions' or 'space'). max_expansions is exact, the others are checked
+        every check_every expansions. Solver.Run() turns it into a result with the
+        status 'Budget exceeded' and the statistics of the search so far
+        '''
+        self.time_limit = time_limit
+        self.max_expansions = max_expansions
+        self.max_space = max_space
+        self.token = token
+        self.check_every = check_every
+        self.deadline = None
+        self.expansions = 0
+        self.planned = 0
+        self.countdown = 0
+
+
+    def start(self):
+        '''
+        Reset the count and the clock, called by Solver.Run just before the search,
+        or by the caller of a strategy run on an engine directly
+        '''
+        self.deadline = perf_counter() + self.time_limit if self.time_limit is not None else None
+        self.expansions = 0
+        self.plan()
+
+
+    def plan(self):
+        countdown = self.check_every
+        if self.max_expansions is not None:
+            countdown = min(countdown, self.max_expansions - self.expansions + 1)
+        self.planned = self.countdown = max(countdown, 1)
+
+
+    def check(self, engine):
+        '''
+        Parameters: engine (GraphSearch)
+
+        Raise BudgetExceeded if a limit is hit, o.w count down to the next check
+        '''
+        self.expansions += self.planned - self.countdown
+        if self.token is not None and self.token.isCancelled():
+            raise BudgetExceeded('cancelled')
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise BudgetExceeded('deadline')
+        if self.max_expansions is not None and self.expansions > self.max_expansions:
+            raise BudgetExceeded('expansions')
+        if self.max_space is not None and engine.space_complexity > self.max_space:
+            raise BudgetExceeded('space')
+        self.plan()
@@ -0,0 +1,68 @@
+BITMAP_LIMIT = 1 << 22 # largest state space kept as a dense bitmap (bytes)
+
+
+class HashClosedSet:
+    def __init__(self, problem=None):
+        '''
+        Closed set of a graph search backed by a hash set. It works for every
+        problem whose states are hashable
+        '''
+        self.states = set()
+
+
+    def add(self, state):
+        self.states.add(state)
+
+
+    def __contains__(self, state):
+        return state in self.states
+
+
+    def __len__(self):
+        return len(self.states)
+
+
+class BitmapClosedSet:
+    def __init__(self, problem):
+        '''
+        Closed set of a graph search backed by a dense bytearray, one byte per
+        state, indexed by the rank of the state (0 <= rank < problem.countStates()).
+        Only suitable for instances whose whole state space fits in memory
+        '''
+        self.rankState = problem.rankState
+        self.visited = bytearray(problem.countStates())
+        self.size = 0
+
+
+    def add(self, state):
+        rank = self.rankState(state)
+        if not self.visited[rank]:
+            self.visited[rank] = 1
+            self.size += 1
+
+
+    def __contains__(self, state):
+        return self.visited[self.rankState(state)] == 1
+
+
+    def __len__(self):
+        return self.size
+
+
+def makeClosedSet(problem, kind='auto'):
+    '''
+    Parameters: problem (type Problem), kind (str): 'hash', 'bitmap', 'auto' or None
+    Return    : an empty closed set (None if kind is None)
+
+    'auto' picks the bitmap when the state space of the problem is small enough
+    '''
+    if kind is None:
+        return None
+    if kind == 'auto':
+        kind = 'bitmap' if problem.countStates() <= BITMAP_LIMIT else 'hash'
+
+    if kind == 'hash':
+        return HashClosedSet(problem)
+    elif kind == 'bitmap':
+        return BitmapClosedSet(problem)
+    raise Exception('SetUndefi: The closed set has not been built yet!')
@@ -0,0 +1,115 @@
+from .GraphSearch import GraphSearch
+from .Node import Node
+
+import heapq
+
+
+class ExactSearch(GraphSearch):
+    def __init__(self, problem, **options):
+        '''
+        Inherit from GraphSearch(), without closed set since the strategies here do
+        not search the state space
+
+        Exact strategies for Bridge and Torch working on the durations sorted in
+        ascending order (the ranks of BridgeTorch) instead of on the states.
+        '''
+        options['closed_set'] = None
+        GraphSearch.__init__(self, problem, **options)
+
+
+    def SortedDP(self):
+        '''
+        Exact strategy in O(n log n), n the number of people
+        Return solution if it find one, o.w return a failure
+
+        The two fastest people (ranks 0 and 1) are the only ones walking back: every
+        other person on the side 0 crosses once, the slowest first, either with the
+        next slowest or escorted by one of the two fastest, and the others on the
+        side 1 never move. For the classic instance (everyone on the side 0) this is
+        the choice between "two fastest shuttle" and "fastest escorts each" at every
+        step. If the candle is on the side 1 with neither of the two fastest, the
+        fastest person there walks it back first.
+
+        A shortest path over (heavies left, side of the two fastest, side of the
+        candle), at most 8 states per heavy, gives the plan.
+        '''
+        problem = self.problem
+        walktimes = problem.walktimes
+        torch = problem.torch
+        shuttle = 3 & problem.people
+        shuttlers = [bit for bit in (1, 2) if bit & shuttle]
+
+        node = self.root_node
+        state = node.state
+        if state & torch and not state & shuttle and not problem.testGoal(state):
+            crossed = state & problem.people
+            if not crossed:
+                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+                return self.findResult()
+            bit = crossed & -crossed
+            node = Node(problem, state ^ bit ^ torch, node, bit)
+            state = node.state
+            self.time_complexity += 1
+
+        heavies = [1 << rank for rank in range(2, len(walktimes)) if not state & (1 << rank)]
+        start = (len(heavies), state & shuttle, state & torch)
+        dist = {start: 0}
+        parent = {start: None}
+        fringe = [(0, start)]
+        goal = None
+
+        while fringe:
+            cost, key = heapq.heappop(fringe)
+            if cost > dist[key]:
+                continue
+            self.checkBudget()
+            left, crossed, side = key
+            if left == 0 and crossed == shuttle:
+                goal = key
+                break
+
+            moves = [] # (crossers, next key)
+            if side:
+                for bit in shuttlers:
+                    if crossed & bit:
+                        moves.append((bit, (left, crossed ^ bit, 0)))
+            else:
+                waiting = [bit for bit in shuttlers if not crossed & bit]
+                if left + len(waiting) == 1:
+                    if left:
+                        moves.append((heavies[0], (0, crossed, torch)))
+                    else:
+                        moves.append((waiting[0], (0, crossed | waiting[0], torch)))
+                else:
+                    if left >= 2: # the two slowest together
+                        moves.append((heavies[left - 1] | heavies[left - 2], (left - 2, crossed, torch)))
+                    if left >= 1: # the slowest escorted
+                        for bit in waiting:
+                            moves.append((heavies[left - 1] | bit, (left - 1, crossed | bit, torch)))
+                    if len(waiting) == 2: # the two fastest together
+                        moves.append((shuttle, (left, shuttle, torch)))
+
+            for crossers, succ in moves:
+                self.time_complexity += 1
+                succ_cost = cost + walktimes[crossers.bit_length() - 1]
+                if succ_cost < dist.get(succ, float('inf')):
+                    dist[succ] = succ_cost
+                    parent[succ] = (key, crossers)
+                    heapq.heappush(fringe, (succ_cost, succ))
+
+        self.space_complexity += len(dist)
+        self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+        if goal is None:
+            return self.findResult()
+
+        plan = []
+        while parent[goal] is not None:
+            goal, crossers = parent[goal]
+            plan.append(crossers)
+        for crossers in reversed(plan):
+            node = Node(problem, node.state ^ crossers ^ torch, node, crossers)
+
+        self.result = node.path_cost
+
+        self.goal_node = node
+        return self.findResult()
@@ -0,0 +1,163 @@
+from collections import deque
+import heapq
+
+
+INF = float('inf')
+
+
+class FIFOFrontier:
+    def __init__(self):
+        '''
+        First in, first out frontier (Breath first search). A state pushed again
+        with a path cost not lower than its best one is dropped: the earlier copy
+        is always popped first, so it could only have been discarded later
+        '''
+        self.queue = deque()
+        self.best_g = {}
+
+
+    def push(self, item, state, g, priority=None):
+        '''
+        Return: whether the item was kept (boolean)
+        '''
+        if g >= self.best_g.get(state, INF):
+            return False
+        self.best_g[state] = g
+        self.queue.append(item)
+        return True
+
+
+    def pop(self):
+        return self.queue.popleft()
+
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class LIFOFrontier:
+    def __init__(self):
+        '''
+        Last in, first out frontier (Depth first search). A later, costlier copy
+        of a state is popped before the earlier one, so no copy is dominated and
+        duplicates are only dropped by the closed set
+        '''
+        self.stack = []
+
+
+    def push(self, item, state, g, priority=None):
+        self.stack.append(item)
+        return True
+
+
+    def pop(self):
+        return self.stack.pop()
+
+
+    def __len__(self):
+        return len(self.stack)
+
+
+class HeapFrontier:
+    def __init__(self):
+        '''
+        Binary heap ordered by priority, ties are popped in insertion order. A state
+        pushed again with a path cost not lower than its best one is dropped; the
+        copies it makes stale are popped after the better one and dropped by the
+        closed set
+        '''
+        self.heap = []
+        self.count = 0
+        self.best_g = {}
+
+
+    def push(self, item, state, g, priority):
+        if g >= self.best_g.get(state, INF):
+            return False
+        self.best_g[state] = g
+        heapq.heappush(self.heap, (priority, self.count, item))
+        self.count += 1
+        return True
+
+
+    def pop(self):
+        return heapq.heappop(self.heap)[2]
+
+
+    def peek(self):
+        '''
+        Return: the lowest priority waiting, infinity if empty. Stale copies are
+        counted, which only makes it lower
+        '''
+        return self.heap[0][0] if self.heap else INF
+
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class BucketFrontier:
+    def __init__(self):
+        '''
+        Bucket queue: one FIFO bucket per priority in use and a heap of those
+        priorities, so a push or pop only touches the heap when a bucket is made or
+        emptied, and the memory grows with the buckets in use, not with the size
+        of the costs. Made for the few distinct costs of Bridge and Torch. Dominated
+        copies are dropped like in HeapFrontier
+        '''
+        self.buckets = {} # priority -> its items, never empty
+        self.priorities = [] # heap of the keys of self.buckets
+        self.size = 0
+        self.best_g = {}
+
+
+    def push(self, item, state, g, priority):
+        if g >= self.best_g.get(state, INF):
+            return False
+        self.best_g[state] = g
+
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = deque()
+            heapq.heappush(self.priorities, priority)
+        bucket.append(item)
+        self.size += 1
+        return True
+
+
+    def pop(self):
+        priority = self.priorities[0]
+        bucket = self.buckets[priority]
+        item = bucket.popleft()
+        if not bucket:
+            del self.buckets[priority]
+            heapq.heappop(self.priorities)
+        self.size -= 1
+        return item
+
+
+    def peek(self):
+        '''
+        Return: the lowest priority waiting, infinity if empty
+        '''
+        return self.priorities[0] if self.priorities else INF
+
+
+    def __len__(self):
+        return self.size
+
+
+def makeFrontier(kind='bucket'):
+    '''
+    Parameters: kind (str): 'fifo', 'lifo', 'heap' or 'bucket'
+    Return    : an empty frontier
+    '''
+    if kind == 'fifo':
+        return FIFOFrontier()
+    elif kind == 'lifo':
+        return LIFOFrontier()
+    elif kind == 'heap':
+        return HeapFrontier()
+    elif kind == 'bucket':
+        return BucketFrontier()
+    raise Exception('FrontUndefi: The frontier has not been built yet!')
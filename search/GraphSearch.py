@@ -1,34 +1,124 @@
 from .Root import Root
 from .Node import Node
+from .ClosedSet import makeClosedSet
+from .Frontier import makeFrontier
+from .NodeArena import NodeArena
+from .SearchResult import SearchResult
+from .Instrumentation import InstrumentedProblem, InstrumentedFrontier, InstrumentedClosedSet
+
+
+INF = float('inf')
 
 
 class GraphSearch:
-    def __init__(self, problem):
+    def __init__(self, problem, closed_set='auto', frontier='bucket', instrument=None, budget=None):
         '''
-        Parameters: problem (type Problem)
+        Parameters: problem (type Problem), closed_set (str): 'hash', 'bitmap' or 'auto',
+        frontier (str): 'heap' or 'bucket', the priority queue of UCS and A*,
+        instrument (Instrumentation): observes the search if given, budget (Budget):
+        limits of the search if given
         Attributes:
         - self.problem (Problem): The model of problem
         - self.root_node (Node): The root of the problem
-        - self.fringe (list): The fringe of graph
-        - self.explored (list): Contains explored state
+        - self.fringe (Frontier): The fringe of graph, made by each strategy
+        - self.explored (ClosedSet): Contains explored state, O(1) membership
+        - self.closed_set (str): The kind of closed set, for the searches needing more
+        - self.arena (NodeArena): The nodes generated by the last strategy
         - self.time_complexity (integer): Time complexity of strategy implemented
         - self.space_complexity (integer): Space complexity of strategy implemented
+        - self.counters (dict): Extra statistics of the last strategy, by name
+        - self.goal_node (Node): The goal reached by the last strategy, None if it failed
+        or if the goal is given as follows
+        - self.goal_index (integer): The goal as a node of self.arena, None if not
+        - self.goal_actions (list): The goal as the actions reaching it, None if not
+        - self.solutions (list): The better and better solutions of an anytime strategy
+        - self.instrument (Instrumentation or None): Events and timers of the search
+        - self.budget (Budget or None): Limits of the search, see checkBudget
 
         Formulate the graph for searching. The way of formulation is replied on the 
         each problem. In our scope, it is Bridge and Torch.
         '''
         self.problem = problem
         self.root_node = Root(problem) 
-        self.fringe = [self.root_node]
-        self.explored = []
+        self.fringe = None
+        self.closed_set = closed_set
+        self.instrument = instrument
+        if instrument is not None:
+            self.problem = InstrumentedProblem(problem, instrument)
+            instrument.attach(self)
+        self.budget = budget # started by Solver.Run, once the engine is built
+        self.explored = self.newClosedSet()
+        self.frontier = frontier
+        self.arena = None
 
         self.result = None
+        self.goal_node = None
+        self.goal_index = None
+        self.goal_actions = None
 
         self.time_complexity = 1 
         self.space_complexity = 1
         self.max_space_complexity = 1
+        self.counters = {}
+        self.solutions = []
     
 
+    def newFrontier(self, kind):
+        '''
+        Return: an empty frontier of the kind, observed by self.instrument if any
+        '''
+        frontier = makeFrontier(kind)
+        return InstrumentedFrontier(frontier, self.instrument) if self.instrument is not None else frontier
+
+
+    def timeFrontier(self, function):
+        '''
+        Return: function (of heapq), timed as the frontier by self.instrument if any,
+        for the strategies keeping their fringe in a heap that a Frontier cannot
+        reorder or evict from
+        '''
+        return self.instrument.timed(function, 'frontier') if self.instrument is not None else function
+
+
+    def newClosedSet(self):
+        '''
+        Return: an empty closed set of the kind self.closed_set, observed by
+        self.instrument if any
+        '''
+        explored = makeClosedSet(self.problem, self.closed_set)
+        if self.instrument is not None and explored is not None:
+            return InstrumentedClosedSet(explored, self.instrument)
+        return explored
+
+
+    def findResult(self):
+        '''
+        Return: the outcome of the last strategy (SearchResult), from self.goal_node,
+        self.goal_index or self.goal_actions. The chain of nodes of the last two is
+        only built when the result is asked for them, out of the timed search
+        '''
+        if self.goal_node is None and self.goal_index is not None:
+            return SearchResult(self.problem, arena=self.arena, index=self.goal_index)
+        if self.goal_node is None and self.goal_actions is not None:
+            return SearchResult(self.problem, actions=self.goal_actions, cost=self.result)
+        return SearchResult(self.problem, self.goal_node)
+
+
+    def checkBudget(self, count=1):
+        '''
+        Parameters: count (integer): the nodes expanded
+
+        Called by every strategy for each node it expands: raise BudgetExceeded once
+        a limit of self.budget is hit. Only a count down, the limits themselves are
+        checked by the budget every few expansions
+        '''
+        budget = self.budget
+        if budget is not None:
+            budget.countdown -= count
+            if budget.countdown <= 0:
+                budget.check(self)
+
+
     def expandNode(self, node):
         '''
         Parameters: node (type Node)
@@ -36,6 +126,7 @@ class GraphSearch:
 
         Construct a list of child nodes from the current node 
         '''
+        self.checkBudget()
         successors = []
         for action, result_state in self.problem.findSuccessorFn(node.state):
             new_node = Node(self.problem, result_state, node, action)
@@ -44,121 +135,184 @@ class GraphSearch:
             successors.append(new_node)
 
         return successors
-    
 
-    def BreathFirstSearch(self):
+
+    def graphSearch(self, frontier, heuristic_id=None):
         '''
-        Graph search using strategy Uniform cost search
-        Return solution if it find one, o.w return a failure
+        Parameters: frontier (Frontier), heuristic_id (integer or None)
+        Return    : solution if it find one, o.w return a failure
+
+        Graph search shared by every strategy, which only differs by its frontier.
+        Nodes are prioritized by path cost, plus the heuristic if one is given.
+        Children already explored or dominated in the frontier are never pushed.
+        Nodes live in a NodeArena, the frontier holds their indexes
         '''
-        while self.fringe:
-            node = self.fringe.pop(0)
-            
-            if self.problem.testGoal(node.state):
-                self.result = node.path_cost
+        problem = self.problem
+        explored = self.explored
+        arena = self.arena = NodeArena(problem)
+        self.fringe = frontier
+
+        state = self.root_node.state
+        h = problem.findHeuristic(state, heuristic_id) if heuristic_id is not None else 0
+        frontier.push(arena.add(state, -1, 0, 0, h), state, 0, h)
+
+        while frontier:
+            index = frontier.pop()
+            state = arena.state[index]
+
+            if problem.testGoal(state):
+                self.result = arena.g[index]
+                self.goal_index = index
+                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+                return self.findResult()
+
+            if state in explored:
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
-                + str(self.problem.findSolution(node))
-            
-            if node.state not in self.explored:
-                self.explored.append(node.state)
-                self.space_complexity += 1 # Keep node.state in explored
-                child_nodes = self.expandNode(node)
-                self.fringe += child_nodes
-            
-            else:
+                self.space_complexity -= 1
+                continue
+
+            self.checkBudget()
+            explored.add(state)
+            self.space_complexity += 1 # Keep node.state in explored
+            g = arena.g[index]
+            for action, result_state in problem.findSuccessorFn(state):
+                self.time_complexity += 1
+                self.space_complexity += 1
+                if result_state not in explored:
+                    path_cost = g + problem.findStepCost(action)
+                    h = problem.findChildHeuristic(state, arena.h[index], action, result_state, heuristic_id) \
+                        if heuristic_id is not None else 0
+                    if frontier.push(len(arena), result_state, path_cost, path_cost + h):
+                        arena.add(result_state, index, action, path_cost, h)
+                        continue
+
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
                 self.space_complexity -= 1
 
         self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-        return 'Status: Solution not found\n'
+        return self.findResult()
     
 
-    def DepthFirstSearch(self):
+    def BreathFirstSearch(self):
         '''
-        Graph search using strategy Depth first search
+        Graph search using strategy Breath first search (FIFO frontier)
         Return solution if it find one, o.w return a failure
         '''
-        while self.fringe:
-            node = self.fringe.pop()
-            
-            if self.problem.testGoal(node.state):
-                self.result = node.path_cost
-                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
-                + str(self.problem.findSolution(node))
-            
-            if node.state not in self.explored:
-                self.explored.append(node.state)
-                self.space_complexity += 1 # Keep node.state in explored
-                child_nodes = self.expandNode(node)
-                self.fringe += child_nodes
-            
-            else:
-                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                self.space_complexity -= 1
+        return self.graphSearch(self.newFrontier('fifo'))
+    
 
-        self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-        return 'Status: Solution not found\n'
+    def DepthFirstSearch(self):
+        '''
+        Graph search using strategy Depth first search (LIFO frontier)
+        Return solution if it find one, o.w return a failure
+        '''
+        return self.graphSearch(self.newFrontier('lifo'))
 
 
     def UniformCostSearch(self):
         '''
-        Graph search using strategy Uniform cost search
+        Graph search using strategy Uniform cost search (priority g)
         Return solution if it find one, o.w return a failure
         '''
-        while self.fringe:
-            node = self.fringe.pop(self.fringe.index(min(self.fringe, 
-                                                        key=lambda x: x.path_cost)))
-            
-            if self.problem.testGoal(node.state):
-                self.result = node.path_cost
-                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
-                + str(self.problem.findSolution(node))
-            
-            elif node.state not in self.explored:
-                self.explored.append(node.state)
-                self.space_complexity += 1 # Keep node.state in explored
-                child_nodes = self.expandNode(node)
-                self.fringe += child_nodes
-            
-            else:
-                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                self.space_complexity -= 1
-
-        self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-        return 'Status: Solution not found\n'
+        return self.graphSearch(self.newFrontier(self.frontier))
     
 
     def ASearch(self, heuristic_id=1):
         '''
-        Graph search using strategy A* search
+        Graph search using strategy A* search (priority g + h)
+        Return solution if it find one, o.w return a failure
+        '''
+        return self.graphSearch(self.newFrontier(self.frontier), heuristic_id)
+
+
+    def BidirectionalSearch(self):
+        '''
+        Graph search using strategy bidirectional Uniform cost search: one Dijkstra
+        forward from the root with Problem.findSuccessorFn, one backward from the
+        goal with Problem.findPredecessorFn, the side with the smaller frontier
+        expanded first. Every generated state known to the other side gives a plan
+        of cost mu, and the search stops once the two lowest priorities add up to
+        mu: no plan through a state still in a frontier can be cheaper.
         Return solution if it find one, o.w return a failure
         '''
-        self.root_node.setHeuristic(heuristic_id)
-        while self.fringe:
-            node = self.fringe.pop(self.fringe.index(min(self.fringe, 
-                                                        key=lambda x: x.path_cost + x.heuristic)))
+        problem = self.problem
+        forward = self.arena = NodeArena(problem)
+        backward = NodeArena(problem)
+        arenas = (forward, backward)
+        frontiers = (self.newFrontier(self.frontier), self.newFrontier(self.frontier))
+        explored = (self.explored, self.newClosedSet())
+        reached = ({}, {}) # state -> index of its cheapest node on each side
+        expansions = [0, 0]
+        transitions = (problem.findSuccessorFn, problem.findPredecessorFn)
+        self.fringe = frontiers[0]
+
+        state = self.root_node.state
+        frontiers[0].push(forward.add(state, -1, 0, 0), state, 0, 0)
+        reached[0][state] = 0
+        for state in (problem.goal, problem.goal ^ problem.torch):
+            if problem.testGoal(state):
+                frontiers[1].push(backward.add(state, -1, 0, 0), state, 0, 0)
+                reached[1][state] = len(backward) - 1
+        self.space_complexity = len(forward) + len(backward)
 
-            if self.problem.testGoal(node.state):
-                self.result = node.path_cost
+        mu, meeting = INF, None
+        if self.root_node.state in reached[1]:
+            mu, meeting = 0, (0, reached[1][self.root_node.state])
+
+        while frontiers[0] and frontiers[1]:
+            if frontiers[0].peek() + frontiers[1].peek() >= mu:
+                break
+
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            arena, frontier, closed, best = arenas[side], frontiers[side], explored[side], reached[side]
+            other, other_best = arenas[1 - side], reached[1 - side]
+
+            index = frontier.pop()
+            state = arena.state[index]
+            if state in closed:
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
-                + str(self.problem.findSolution(node))
-            
-            elif node.state not in self.explored:
-                self.explored.append(node.state)
-                self.space_complexity += 1 # Keep node.state in explored
-                child_nodes = self.expandNode(node)
-                for i in range(len(child_nodes)):
-                    child_nodes[i].setHeuristic(heuristic_id)
-                self.fringe += child_nodes
-            
-            else:
+                self.space_complexity -= 1
+                continue
+
+            self.checkBudget()
+            closed.add(state)
+            expansions[side] += 1
+            self.space_complexity += 1 # Keep node.state in explored
+            g = arena.g[index]
+            for action, result_state in transitions[side](state):
+                self.time_complexity += 1
+                self.space_complexity += 1
+                path_cost = g + problem.findStepCost(action)
+                kept = result_state not in closed and frontier.push(len(arena), result_state, path_cost, path_cost)
+                if kept:
+                    best[result_state] = arena.add(result_state, index, action, path_cost)
+                if result_state in other_best:
+                    total = path_cost + other.g[other_best[result_state]]
+                    if total < mu:
+                        child = best[result_state] if kept else None
+                        if child is None: # reach it through the current node
+                            child = arena.add(result_state, index, action, path_cost)
+                        mu = total
+                        meeting = (child, other_best[result_state]) if side == 0 else (other_best[result_state], child)
+                if kept:
+                    continue
+
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
                 self.space_complexity -= 1
 
+        self.counters = {'Forward expansions': expansions[0], 'Backward expansions': expansions[1]}
         self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-        return 'Status: Solution not found\n'
+        if meeting is None:
+            return self.findResult()
+
+        # Forward plan up to the meeting state, then the backward one replayed
+        actions = forward.findActions(meeting[0])
+        index = meeting[1]
+        while backward.parent[index] != -1:
+            actions.append(backward.action[index])
+            index = backward.parent[index]
+
+        self.result = forward.g[meeting[0]] + backward.g[meeting[1]]
 
+        self.goal_actions = actions
+        return self.findResult()
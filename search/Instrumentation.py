@@ -0,0 +1,239 @@
+from time import perf_counter
+import json
+import csv
+
+
+EVENTS = ('expand', 'generate', 'duplicate', 'goal')
+PHASES = ('successors', 'heuristic', 'frontier', 'closed set')
+
+
+class Instrumentation:
+    def __init__(self, sample_every=256):
+        '''
+        Parameters: sample_every (integer): expansions between two samples of the
+        frontier size
+        Attributes:
+        - self.events (dict): Number of each event: 'expand', 'generate', 'duplicate'
+        (a state dropped by the closed set or the frontier) and 'goal'
+        - self.timers (dict): Seconds spent in each phase: 'successors', 'heuristic',
+        'frontier' and 'closed set'
+        - self.calls (dict): Number of calls timed in each phase
+        - self.samples (list): (seconds, expansions, generated, frontier size, space
+        complexity) every sample_every expansions
+
+        Observes a search engine built with GraphSearch(problem, instrument=...). The
+        engine then talks to its problem, frontiers and closed sets through the
+        proxies below, which time every call and emit the events; without it they
+        are used directly and nothing is measured
+        '''
+        self.sample_every = sample_every
+        self.listeners = {event: [] for event in EVENTS}
+        self.events = dict.fromkeys(EVENTS, 0)
+        self.timers = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.samples = []
+        self.engine = None
+        self.start = None
+
+
+    def on(self, event, callback):
+        '''
+        Parameters: event (str), callback (function) called with the state of the
+        event ('generate': with the parent state, the action and the state)
+        '''
+        if event not in self.listeners:
+            raise Exception('EvenUndefi: The event has not been built yet!')
+        self.listeners[event].append(callback)
+
+
+    def emit(self, event, *args):
+        self.events[event] += 1
+        for callback in self.listeners[event]:
+            callback(*args)
+
+
+    def timed(self, function, phase):
+        '''
+        Return: function timed in phase (function), for a structure the engine uses
+        without a proxy
+        '''
+        timers, calls = self.timers, self.calls
+        def call(*args):
+            start = perf_counter()
+            value = function(*args)
+            timers[phase] += perf_counter() - start
+            calls[phase] += 1
+            return value
+        return call
+
+
+    def attach(self, engine):
+        self.engine = engine
+        self.start = perf_counter()
+
+
+    def sample(self):
+        engine = self.engine
+        fringe = engine.fringe
+        self.samples.append((perf_counter() - self.start, self.events['expand'], self.events['generate'],
+                             len(fringe) if fringe is not None else 0, engine.space_complexity))
+
+
+    def report(self):
+        '''
+        Return: the measures (dict), as exported by exportJSON
+        '''
+        return {'events': dict(self.events),
+                'timers': {phase: {'seconds': self.timers[phase], 'calls': self.calls[phase]} for phase in PHASES},
+                'samples': [list(sample) for sample in self.samples]}
+
+
+    def exportJSON(self, path):
+        with open(path, 'w', encoding='UTF8') as f:
+            json.dump(self.report(), f, indent=1)
+
+
+    def exportCSV(self, path):
+        '''
+        Write the time series of the frontier size, one row per sample
+        '''
+        with open(path, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['seconds', 'expansions', 'generated', 'frontier', 'space complexity'])
+            writer.writerows(self.samples)
+
+
+class InstrumentedProblem:
+    def __init__(self, problem, instrument):
+        '''
+        Proxy of a Problem timing its successor and heuristic functions, emitting
+        'expand', 'generate' and 'goal'. Everything else is the problem's own
+        '''
+        self.problem = problem
+        self.instrument = instrument
+
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+
+    def findSuccessorFn(self, state):
+        return self.expand(self.problem.findSuccessorFn, state)
+
+
+    def findPredecessorFn(self, state):
+        return self.expand(self.problem.findPredecessorFn, state)
+
+
+    def expand(self, function, state):
+        instrument = self.instrument
+        start = perf_counter()
+        transitions = function(state)
+        instrument.timers['successors'] += perf_counter() - start
+        instrument.calls['successors'] += 1
+
+        instrument.emit('expand', state)
+        for action, result_state in transitions:
+            instrument.emit('generate', state, action, result_state)
+        if instrument.events['expand'] % instrument.sample_every == 0:
+            instrument.sample()
+        return transitions
+
+
+    def findHeuristic(self, *args):
+        return self.evaluate(self.problem.findHeuristic, args)
+
+
+    def findChildHeuristic(self, *args):
+        return self.evaluate(self.problem.findChildHeuristic, args)
+
+
+    def evaluate(self, function, args):
+        start = perf_counter()
+        estimated = function(*args)
+        self.instrument.timers['heuristic'] += perf_counter() - start
+        self.instrument.calls['heuristic'] += 1
+        return estimated
+
+
+    def testGoal(self, state):
+        if self.problem.testGoal(state):
+            self.instrument.emit('goal', state)
+            return True
+        return False
+
+
+class InstrumentedFrontier:
+    def __init__(self, frontier, instrument):
+        '''
+        Proxy of a frontier timing its operations, emitting 'duplicate' for the
+        pushes it drops
+        '''
+        self.frontier = frontier
+        self.instrument = instrument
+
+
+    def push(self, item, state, g, priority=None):
+        start = perf_counter()
+        kept = self.frontier.push(item, state, g, priority)
+        self.time(start)
+        if not kept:
+            self.instrument.emit('duplicate', state)
+        return kept
+
+
+    def pop(self):
+        start = perf_counter()
+        item = self.frontier.pop()
+        self.time(start)
+        return item
+
+
+    def peek(self):
+        start = perf_counter()
+        priority = self.frontier.peek()
+        self.time(start)
+        return priority
+
+
+    def time(self, start):
+        self.instrument.timers['frontier'] += perf_counter() - start
+        self.instrument.calls['frontier'] += 1
+
+
+    def __len__(self):
+        return len(self.frontier)
+
+
+class InstrumentedClosedSet:
+    def __init__(self, closed_set, instrument):
+        '''
+        Proxy of a closed set timing its operations, emitting 'duplicate' for the
+        states found in it
+        '''
+        self.closed_set = closed_set
+        self.instrument = instrument
+
+
+    def add(self, state):
+        start = perf_counter()
+        self.closed_set.add(state)
+        self.time(start)
+
+
+    def __contains__(self, state):
+        start = perf_counter()
+        found = state in self.closed_set
+        self.time(start)
+        if found:
+            self.instrument.emit('duplicate', state)
+        return found
+
+
+    def time(self, start):
+        self.instrument.timers['closed set'] += perf_counter() - start
+        self.instrument.calls['closed set'] += 1
+
+
+    def __len__(self):
+        return len(self.closed_set)
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize=1 << 16):
+        '''
+        Parameters: maxsize (integer): the number of entries kept, 0 disables it
+        Attributes:
+        - self.hits (integer): Lookups answered by the cache
+        - self.misses (integer): Lookups not answered
+
+        Bounded mapping which evicts the least recently used entry when full
+        '''
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, key, default=None):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return default
+
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+
+    def copy(self, keep=None):
+        '''
+        Parameters: keep (function): whether the entry of a key is copied, all of
+        them by default
+        Return    : a cache of the same size with those entries, in the same order
+        '''
+        cache = LRUCache(self.maxsize)
+        for key, value in self.entries.items():
+            if keep is None or keep(key):
+                cache.entries[key] = value
+        return cache
+
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+    def __len__(self):
+        return len(self.entries)
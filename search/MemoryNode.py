@@ -0,0 +1,66 @@
+INF = float('inf')
+
+
+class MemoryNode:
+    __slots__ = ('state', 'parent', 'index', 'action', 'depth', 'g', 'h', 'f', 'successors', 'estimates', 'children',
+                 'generated', 'again', 'version')
+
+    def __init__(self, state, parent, index, action, g, h, f):
+        '''
+        Parameters: state (integer), parent (type MemoryNode), index (integer): its
+        rank among the successors of the parent, action (integer), g, h and f
+        (integer): path cost, heuristic and f-value
+
+        Node of SMA* (TreeSearch.MemoryBoundedSearch), which may forget and regenerate
+        its children:
+        - self.f: Lowest f of a goal below the node as far as known, backed up from
+        its successors
+        - self.successors: (action, state, path cost, heuristic) of each successor,
+        None until the node is expanded
+        - self.estimates: f of each successor, the one of its node if in memory, o.w
+        the value backed up when it was forgotten
+        - self.children: The successors in memory, by rank
+        - self.generated: Bit i set once successor i was generated
+        - self.again: Whether the node, or one of its ancestors, was generated before
+        and forgotten
+        - self.version: Bumped at each change, the older heap entries being stale
+        '''
+        self.state = state
+        self.parent = parent
+        self.index = index
+        self.action = action
+        self.depth = parent.depth + 1 if parent else 0
+        self.g = g
+        self.h = h
+        self.f = f
+        self.successors = None
+        self.estimates = None
+        self.children = {}
+        self.generated = 0
+        self.again = parent.again if parent else False
+        self.version = 0
+
+
+    def findNext(self):
+        '''
+        Return: rank of the successor to generate next, the lowest estimate out of
+        memory, None if every successor is in memory or hopeless. An unexpanded node
+        is -1
+        '''
+        if self.successors is None:
+            return -1 if self.f < INF else None
+        best = None
+        for index, estimate in enumerate(self.estimates):
+            if index not in self.children and estimate < INF and (best is None or estimate < self.estimates[best]):
+                best = index
+        return best
+
+
+    def findKey(self):
+        '''
+        Return: the f of the next successor to generate (integer), infinity if none
+        '''
+        index = self.findNext()
+        if index is None:
+            return INF
+        return self.f if index == -1 else self.estimates[index]
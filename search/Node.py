@@ -1,18 +1,22 @@
 class Node:
+    __slots__ = ('state', 'parent', 'action', 'depth', 'path_cost', 'heuristic')
+
     def __init__(self, problem, state, parent, action):
         '''
-        Parameters: problem (type Problem), state (list), parent(type Node),
-        action(list - list, tuple)
+        Parameters: problem (type Problem), state (integer), parent(type Node),
+        action(integer)
 
         Nodes are for searching. Each node has attributes:
-        - self.problem: The model of problem
+        - self.state: The state of the problem at this node
         - self.parent: The parent node of the current node
         - self.action: The single action done in the parent node's state leads to
         the current state
         - self.path_cost: The total cost to reach to this node from the beginning
         - self.heuristic: Heuristic of the current state
+
+        The problem is only used to price the action, nodes keep no reference to it
+        and have no __dict__ (__slots__)
         '''
-        self.problem = problem
         self.state = state 
         self.parent = parent 
         self.action = action
@@ -21,5 +25,9 @@ class Node:
         self.heuristic = None
     
     
-    def setHeuristic(self, id=2):
-        self.heuristic = self.problem.findHeuristic(self.state, id)
\ No newline at end of file
+    def setHeuristic(self, problem, id=2):
+        parent = self.parent
+        if parent is not None and parent.heuristic is not None:
+            self.heuristic = problem.findChildHeuristic(parent.state, parent.heuristic, self.action, self.state, id)
+        else:
+            self.heuristic = problem.findHeuristic(self.state, id)
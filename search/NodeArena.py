@@ -0,0 +1,79 @@
+from array import array
+
+from .Node import Node
+
+
+class NodeArena:
+    def __init__(self, problem):
+        '''
+        Parameters: problem (type Problem)
+        Attributes:
+        - self.state (array): State of each node
+        - self.parent (array): Index of the parent node, -1 for the root
+        - self.action (array): Action leading from the parent to the node
+        - self.g (array): Path cost of each node
+        - self.h (array): Heuristic of each node
+
+        Struct of arrays holding the nodes of a graph search. A node is the index
+        of its row, so storing one costs a few machine words instead of an object.
+        States too wide for a 64-bit column (more than 62 people) are kept in lists
+        '''
+        if problem.countStates() <= 1 << 63:
+            self.state = array('q')
+            self.action = array('q')
+        else:
+            self.state = []
+            self.action = []
+        self.parent = array('i')
+        self.g = array('q')
+        self.h = array('q')
+
+
+    def add(self, state, parent, action, g, h=0):
+        '''
+        Return: index of the new node (integer)
+        '''
+        self.state.append(state)
+        self.parent.append(parent)
+        self.action.append(action)
+        self.g.append(g)
+        self.h.append(h)
+        return len(self.g) - 1
+
+
+    def findActions(self, index):
+        '''
+        Parameters: index (integer)
+        Return    : the actions from the root to the node at index (list)
+        '''
+        actions = []
+        while self.parent[index] != -1:
+            actions.append(self.action[index])
+            index = self.parent[index]
+        actions.reverse()
+        return actions
+
+
+    def toNode(self, problem, index):
+        '''
+        Parameters: problem (type Problem), index (integer)
+        Return    : node (type Node)
+
+        Rebuild the chain of Node objects from the root to the node at index, so
+        that Problem.findSolution can backtrack it
+        '''
+        path = []
+        while index != -1:
+            path.append(index)
+            index = self.parent[index]
+
+        node = None
+        for index in reversed(path):
+            action = self.action[index] if node else None
+            node = Node(problem, self.state[index], node, action)
+            node.heuristic = self.h[index]
+        return node
+
+
+    def __len__(self):
+        return len(self.g)
@@ -0,0 +1,357 @@
+from .GraphSearch import GraphSearch, INF
+from .Instrumentation import InstrumentedProblem
+
+from time import perf_counter
+from queue import Empty
+import multiprocessing
+import heapq
+import os
+
+
+MIX = 0x9E3779B97F4A7C15 # Fibonacci hashing
+MASK = (1 << 64) - 1
+TICK = 1024 # expansions of a worker between two reports, and most expansions granted at once
+POLL = 0.05 # seconds between two checks of the budget by the master
+
+
+def findOwner(state, workers):
+    '''
+    Return: the worker owning state (integer), by a multiplicative hash of it
+    '''
+    mixed = 0
+    while True:
+        mixed = ((mixed ^ (state & MASK)) * MIX) & MASK
+        state >>= 64
+        if not state:
+            return (mixed >> 32) % workers
+
+
+def searchPartition(me, workers, problem, heuristic_id, inboxes, results, batch, allowance=None):
+    '''
+    Loop of the worker process me of ParallelSearch: A* on the states it owns. It
+    receives nodes (state, g, h, parent state, action) in its inbox and sends the
+    children to their owners, batch by batch, and answers the master on the same
+    inbox: 'bound' (a new incumbent cost), 'grant' (more expansions), 'probe',
+    'path' and 'stop'. allowance is the number of nodes it may expand, None for no
+    limit: once spent, it asks the master for more and waits, and gives back what
+    is left when idle
+    '''
+    for inbox in inboxes:
+        inbox.cancel_join_thread() # never wait at exit for batches nobody reads
+    inbox = inboxes[me]
+    fringe = [] # heap of (f, -g, tie, state, g, h)
+    best = {} # state -> (g, parent state, action)
+    outboxes = [[] for _ in range(workers)]
+    upper = INF
+    tie = 0
+    sent = received = 0
+    expanded = generated = unreported = 0
+    active = False # since the last probe
+    idle_reported = False
+    waiting = False # for a grant
+    peak = 0
+
+    def receive(state, g, h, parent, action):
+        nonlocal tie
+        if g >= best.get(state, (INF,))[0] or g + h >= upper:
+            return
+        best[state] = (g, parent, action)
+        if problem.testGoal(state):
+            results.put(('goal', me, g, state))
+        else:
+            heapq.heappush(fringe, (g + h, -g, tie, state, g, h))
+            tie += 1
+
+    def flush():
+        nonlocal sent
+        for owner, nodes in enumerate(outboxes):
+            if nodes:
+                inboxes[owner].put(('nodes', nodes))
+                sent += len(nodes)
+                outboxes[owner] = []
+
+    def handle(message):
+        # Return: False once stopped
+        nonlocal upper, received, active, idle_reported, allowance, waiting
+        kind = message[0]
+        if kind == 'nodes':
+            received += len(message[1])
+            active = True
+            for node in message[1]:
+                receive(*node)
+        elif kind == 'bound':
+            upper = min(upper, message[1])
+        elif kind == 'grant':
+            allowance += message[1]
+            waiting = False
+        elif kind == 'probe':
+            flush() # the nodes buffered are counted as sent
+            idle = not fringe or fringe[0][0] >= upper
+            results.put(('probe', me, message[1], sent, received, active, idle))
+            active = False
+            idle_reported = idle_reported and idle # tell the master once idle
+        elif kind == 'path':
+            g, parent, action = best[message[1]]
+            results.put(('path', message[1], parent, action))
+        elif kind == 'stop':
+            results.put(('stats', me, {'expansions': expanded, 'generated': generated, 'stored': len(best),
+                                       'peak': peak, 'sent': sent, 'received': received}))
+            return False
+        return True
+
+    while True:
+        try: # everything waiting, without blocking
+            while True:
+                if not handle(inbox.get_nowait()):
+                    return
+        except Empty:
+            pass
+
+        while fringe and fringe[0][0] >= upper: # cannot beat the incumbent
+            heapq.heappop(fringe)
+        if not fringe:
+            flush()
+            if not idle_reported or allowance:
+                results.put(('idle', me, unreported, allowance or 0, generated, len(best)))
+                unreported = 0
+                if allowance is not None: # given back
+                    allowance = 0
+                idle_reported, waiting = True, False
+            if not handle(inbox.get()):
+                return
+            continue
+        if allowance == 0:
+            flush()
+            if not waiting:
+                results.put(('tick', me, unreported, generated, len(best) + len(fringe), True))
+                unreported = 0
+                waiting = True
+            if not handle(inbox.get()):
+                return
+            continue
+
+        idle_reported = False
+        active = True
+        steps = batch
+        while steps and fringe and fringe[0][0] < upper and allowance != 0:
+            f, _, _, state, g, h = heapq.heappop(fringe)
+            if g > best[state][0]: # stale
+                continue
+            steps -= 1
+            if allowance is not None:
+                allowance -= 1
+            expanded += 1
+            unreported += 1
+            for action, result_state in problem.findSuccessorFn(state):
+                generated += 1
+                path_cost = g + problem.findStepCost(action)
+                if path_cost >= upper:
+                    continue
+                child_h = problem.findChildHeuristic(state, h, action, result_state, heuristic_id)
+                owner = findOwner(result_state, workers)
+                if owner == me:
+                    receive(result_state, path_cost, child_h, state, action)
+                else:
+                    outboxes[owner].append((result_state, path_cost, child_h, state, action))
+                    if len(outboxes[owner]) >= batch:
+                        inboxes[owner].put(('nodes', outboxes[owner]))
+                        sent += len(outboxes[owner])
+                        outboxes[owner] = []
+        peak = max(peak, len(best) + len(fringe))
+        if unreported >= TICK:
+            results.put(('tick', me, unreported, generated, len(best) + len(fringe), False))
+            unreported = 0
+
+
+class ParallelSearch(GraphSearch):
+    def __init__(self, problem, workers=None, batch=64, **options):
+        '''
+        Parameters: problem (type Problem), workers (integer): processes searching,
+        the number of CPUs by default, batch (integer): nodes sent or expanded at once
+        Attributes:
+        - self.workers (integer): Number of worker processes
+        - self.reports (list): Statistics of each worker after the last strategy
+        (dict): expansions, generated, stored, peak, sent and received
+
+        Inherit from GraphSearch(), without closed set in this process: each worker
+        keeps the states it owns
+        '''
+        options['closed_set'] = None
+        GraphSearch.__init__(self, problem, **options)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch = batch
+        self.reports = []
+
+
+    def receiveMessage(self, results, processes, checking=True):
+        '''
+        Parameters: checking (boolean): whether to check the budget while waiting
+        Return    : the next message of the workers, raising an exception if one of
+        them died instead of waiting for it forever. The clock, the token and the
+        space of the budget are checked every POLL seconds
+        '''
+        while True:
+            if checking and self.budget is not None and perf_counter() >= self.next_check:
+                self.budget.check(self)
+                self.next_check = perf_counter() + POLL
+            try:
+                return results.get(timeout=POLL)
+            except Empty:
+                if not all(process.is_alive() for process in processes):
+                    raise Exception('Invalid search! A worker process died.')
+
+
+    def countExpansions(self, me, expanded, generated, stored):
+        '''
+        Account the progress reported by worker me: expanded nodes since its last
+        report, and its generated and stored nodes so far
+        '''
+        self.expanded += expanded
+        self.generated[me], self.stored[me] = generated, stored
+        self.time_complexity = sum(self.generated) + 1
+        self.space_complexity = sum(self.stored) + 1
+        self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+        self.checkBudget(expanded)
+
+
+    def stopWorkers(self, processes, inboxes, results):
+        '''
+        Stop the worker processes and gather their statistics: self.reports, the
+        complexities (summed over the workers), the expansions of each worker and the
+        load imbalance (most expansions over the mean) in self.counters
+        '''
+        for inbox in inboxes:
+            inbox.put(('stop',))
+        stopped = 0
+        while stopped < len(processes):
+            try:
+                message = results.get(timeout=5)
+            except Empty: # a worker died
+                break
+            if message[0] == 'stats':
+                self.reports[message[1]] = message[2]
+                stopped += 1
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        for inbox in inboxes: # what is left in them is for nobody
+            inbox.cancel_join_thread()
+            inbox.close()
+        results.close()
+
+        reports = [report for report in self.reports if report is not None]
+        expansions = [report['expansions'] for report in reports]
+        self.time_complexity = sum(report['generated'] for report in reports) + 1
+        self.space_complexity = sum(report['stored'] for report in reports) + 1
+        self.max_space_complexity = max(self.max_space_complexity, sum(report['peak'] for report in reports) + 1)
+        self.counters = {f'Worker {me} expansions': report['expansions'] for me, report in enumerate(self.reports) if report}
+        mean = sum(expansions) / len(expansions) if expansions else 0
+        self.counters['Load imbalance'] = max(expansions) / mean if mean else 1.0
+
+
+    def HashDistributedSearch(self, heuristic_id=1):
+        '''
+        Graph search using strategy Hash distributed A* (HDA*): every state is owned by
+        one worker process (findOwner), which alone keeps its best path cost and
+        expands it, by A* on its own fringe. Children are sent to their owners in
+        batches; the cost of a goal reached is broadcast as the incumbent, and nodes
+        not cheaper (f = g + h) are dropped. The search ends once every worker is
+        idle and no node is on its way: two rounds of probes in a row where nobody
+        was active in between and as many nodes were received as sent. The
+        incumbent is then optimal, the heuristic being admissible.
+        With max_expansions in the budget, the workers expand nodes granted by this
+        process out of it, so the limit is exact as in the other strategies; the
+        other limits are checked every POLL seconds. The workers run the problem
+        itself: with instrument=..., the counters of the instrumentation stay 0
+        Return solution if it find one, o.w return a failure
+        '''
+        problem = self.problem.problem if isinstance(self.problem, InstrumentedProblem) else self.problem
+        workers = self.workers
+        state = self.root_node.state
+        if problem.testGoal(state):
+            self.goal_node = self.root_node
+            self.result = 0
+            return self.findResult()
+
+        limit = self.budget.max_expansions if self.budget is not None else None
+        allowance = min(TICK, limit // workers) if limit is not None else None
+        pool = limit - allowance * workers if limit is not None else None # expansions not granted
+        waiting = set() # workers out of expansions
+
+        inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=searchPartition, daemon=True,
+                                             args=(me, workers, problem, heuristic_id, inboxes, results, self.batch, allowance))
+                     for me in range(workers)]
+        for process in processes:
+            process.start()
+
+        upper, goal = INF, None
+        wave, replies, quiet, probing = 0, [], False, False
+        busy = set(range(workers)) # until they say they are idle
+        self.reports = [None] * workers
+        self.generated, self.stored = [0] * workers, [0] * workers
+        self.expanded = 0
+        self.next_check = perf_counter() + POLL
+        try:
+            inboxes[findOwner(state, workers)].put(('nodes', [(state, 0, problem.findHeuristic(state, heuristic_id), None, None)]))
+            while True:
+                message = self.receiveMessage(results, processes)
+                kind = message[0]
+                if kind == 'goal':
+                    if message[2] < upper:
+                        upper, goal = message[2], message[3]
+                        for inbox in inboxes:
+                            inbox.put(('bound', upper))
+                elif kind == 'tick':
+                    self.countExpansions(message[1], message[2], message[3], message[4])
+                    if message[5]:
+                        waiting.add(message[1])
+                elif kind == 'idle':
+                    busy.discard(message[1])
+                    waiting.discard(message[1])
+                    self.countExpansions(message[1], message[2], message[4], message[5])
+                    if limit is not None:
+                        pool += message[3]
+                if waiting: # share what is left of the budget
+                    while waiting and pool:
+                        grant = min(TICK, max(1, pool // workers))
+                        pool -= grant
+                        inboxes[waiting.pop()].put(('grant', grant))
+                    if waiting and self.expanded == limit - pool: # nothing left anywhere: one more expansion is over
+                        self.checkBudget()
+                elif kind == 'probe' and message[2] == wave:
+                    replies.append(message)
+                    if not message[6]:
+                        busy.add(message[1])
+                    if len(replies) < workers:
+                        continue
+                    active = any(reply[5] or not reply[6] for reply in replies)
+                    balanced = sum(reply[3] for reply in replies) + 1 == sum(reply[4] for reply in replies)
+                    if quiet and not active and balanced:
+                        break
+                    quiet = not active
+                    probing = False
+                if not probing and not busy: # a round of probes, when everybody seems idle
+                    probing, wave, replies = True, wave + 1, []
+                    for inbox in inboxes:
+                        inbox.put(('probe', wave))
+
+            actions = []
+            while goal is not None: # ask the owners of the plan for its parents
+                inboxes[findOwner(goal, workers)].put(('path', goal))
+                message = self.receiveMessage(results, processes, False)
+                while message[0] != 'path':
+                    message = self.receiveMessage(results, processes, False)
+                _, _, goal, action = message
+                if goal is not None:
+                    actions.append(action)
+        finally:
+            self.stopWorkers(processes, inboxes, results)
+
+        if upper == INF:
+            return self.findResult()
+        self.result = upper
+        self.goal_actions = actions[::-1]
+        return self.findResult()
@@ -0,0 +1,94 @@
+import heapq
+import json
+
+
+class PatternDatabase:
+    def __init__(self, profile, table=None):
+        '''
+        Parameters: profile (tuple): given by findProfile(), table (list): a table
+        already built for this profile
+        Attributes:
+        - self.profile (tuple): Durations of the pattern and of the helper
+        - self.table (list): Exact cost of the abstract state at each index
+
+        Pattern database heuristic. The pattern is the two fastest people (the ones
+        walking back) and the `size` slowest; everyone else becomes a helper, always
+        available on both sides with the smallest duration among them. A concrete
+        plan is also an abstract one, no more costly, so the exact abstract cost is
+        an admissible and consistent heuristic. Abstract states are indexed by the
+        places of the pattern (fastest first) and the candle.
+        '''
+        self.profile = profile
+        self.table = table if table is not None else self.buildTable()
+
+
+    def buildTable(self):
+        '''
+        Return: table (list)
+
+        Dijkstra from the abstract goals (the whole pattern on the side 1). Moves are
+        reversible, so the distance from a goal is the cost to reach one. States
+        which cannot reach a goal (without helper, the candle alone) are left at 0
+        '''
+        pattern, helper = self.profile
+        width = len(pattern)
+        people = (1 << width) - 1
+        torch = 1 << width
+
+        table = [float('inf')] * (torch << 1)
+        fringe = [(0, people), (0, people | torch)]
+        table[people] = table[people | torch] = 0
+
+        while fringe:
+            cost, state = heapq.heappop(fringe)
+            if cost > table[state]:
+                continue
+            here = [i for i in range(width) if bool(state >> i & 1) == bool(state & torch)]
+            moves = [] # (crossers mask, duration)
+            for x in range(len(here)):
+                moves.append((1 << here[x], pattern[here[x]]))
+                if helper is not None:
+                    moves.append((1 << here[x], max(pattern[here[x]], helper)))
+                for y in range(x + 1, len(here)):
+                    moves.append(((1 << here[x]) | (1 << here[y]), max(pattern[here[x]], pattern[here[y]])))
+            if helper is not None:
+                moves.append((0, helper))
+
+            for crossers, duration in moves:
+                succ = state ^ crossers ^ torch
+                if cost + duration < table[succ]:
+                    table[succ] = cost + duration
+                    heapq.heappush(fringe, (cost + duration, succ))
+
+        return [0 if cost == float('inf') else cost for cost in table] # dead ends
+
+
+    def save(self, path):
+        with open(path, 'w', encoding='UTF8') as f:
+            json.dump({'profile': self.profile, 'table': self.table}, f)
+
+
+def findProfile(walktimes, size=6):
+    '''
+    Parameters: walktimes (list): durations in ascending order, size (integer)
+    Return    : (pattern durations, helper duration or None)
+
+    Instances with the same profile share the same pattern database: the pattern
+    is the two fastest and the `size` slowest people, the helper is the fastest of
+    the others
+    '''
+    n = len(walktimes)
+    if n <= size + 2:
+        return (tuple(walktimes), None)
+    return (tuple(walktimes[:2]) + tuple(walktimes[n - size:]), walktimes[2])
+
+
+def loadPatternDatabase(path):
+    '''
+    Parameters: path (str) of a table saved by PatternDatabase.save()
+    Return    : PatternDatabase
+    '''
+    with open(path, encoding='UTF8') as f:
+        data = json.load(f)
+    pattern, helper = data['profile']
+    return PatternDatabase((tuple(pattern), helper), data['table'])
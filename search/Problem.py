@@ -5,6 +5,9 @@ class Problem:
     def findSuccessorFn(self):
         pass
 
+    def findPredecessorFn(self):
+        pass
+
     def findStepCost(self):
         pass
 
@@ -15,4 +18,19 @@ class Problem:
         pass
 
     def testGoal(self):
+        pass
+
+    def decodeState(self):
+        pass
+
+    def rankState(self):
+        pass
+
+    def countStates(self):
+        pass
+
+    def findDepthBound(self):
+        pass
+
+    def findCanonicalKey(self):
         pass
\ No newline at end of file
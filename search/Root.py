@@ -2,6 +2,7 @@ from .Node import Node
 
 
 class Root(Node):
+    __slots__ = ()
+
     def __init__(self, problem):
         Node.__init__(self, problem=problem, state=problem.init_state, parent=None, action=None)
-
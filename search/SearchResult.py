@@ -0,0 +1,89 @@
+class SearchResult:
+    def __init__(self, problem, goal_node=None, actions=None, cost=None, arena=None, index=None):
+        '''
+        Parameters: problem (type Problem), goal_node (type Node): the goal reached,
+        None if the search failed, actions (list) and cost (integer): the plan and
+        its duration instead of the goal node, for a solution restored from a cache
+        or backtracked by the search, arena (NodeArena) and index (integer): the goal
+        as a node of the arena instead
+        Attributes:
+        - self.problem (Problem): The problem solved
+        - self.goal_node (Node): The goal reached, None if there is no solution or
+        until findGoalNode() is called for a goal given otherwise
+        - self.arena (NodeArena): The nodes of the search, the goal at self.index,
+        dropped once the goal node is built
+        - self.actions (list): The plan, None until findActions() is called
+        - self.cost (integer): Overall duration of the solution, None if there is none
+        - self.runtime (float): Seconds spent by the search itself
+        - self.time_complexity (integer): Time complexity of the search
+        - self.space_complexity (integer): Space complexity of the search
+        - self.max_space_complexity (integer): Max space complexity of the search
+        - self.counters (dict): Extra statistics of the strategy, by name
+        - self.solutions (list): (seconds, cost, bound) of each better solution of an
+        anytime strategy
+        - self.pruned_complexity (integer): Successors skipped by the problem's pruning
+        - self.cached (boolean): Whether the solution came from a SolutionCache
+        - self.exceeded (str): The limit of the Budget which stopped the search, None
+        if it was not stopped. Only an anytime strategy has a solution then
+
+        Outcome of a search, returned by every strategy and by Solver.Run(). Only the
+        goal is kept: the plan (findActions), the chain of nodes (findGoalNode) and
+        the text of the solution (str()) are made when first asked for, after the
+        search is timed
+        '''
+        self.problem = problem
+        self.goal_node = goal_node
+        self.arena = arena
+        self.index = index
+        if goal_node is not None:
+            self.cost = goal_node.path_cost
+        elif arena is not None:
+            self.cost = arena.g[index]
+        else:
+            self.cost = cost
+        self.actions = actions
+
+        self.runtime = None
+        self.time_complexity = None
+        self.space_complexity = None
+        self.max_space_complexity = None
+        self.counters = {}
+        self.solutions = []
+        self.pruned_complexity = 0
+        self.cached = False
+        self.exceeded = None
+
+
+    def findActions(self):
+        '''
+        Return: the actions from the initial state to the goal (list), None if there
+        is no solution
+        '''
+        if self.actions is None and self.goal_node is not None:
+            self.actions = self.problem.findActions(self.goal_node)
+        elif self.actions is None and self.arena is not None:
+            self.actions = self.arena.findActions(self.index)
+        return self.actions
+
+
+    def findGoalNode(self):
+        '''
+        Return: the goal node (type Node), rebuilt from the arena or the actions if
+        the search did not give it, None if there is no solution
+        '''
+        if self.goal_node is None and self.arena is not None:
+            self.goal_node = self.arena.toNode(self.problem, self.index)
+            self.arena = None # the rest of the nodes is not needed any more
+        elif self.goal_node is None and self.actions is not None:
+            self.goal_node = self.problem.findGoalNode(self.actions)
+        return self.goal_node
+
+
+    def __str__(self):
+        node = self.findGoalNode()
+        if node is None:
+            if self.exceeded is not None:
+                return f'Status: Budget exceeded ({self.exceeded})\n'
+            return 'Status: Solution not found\n'
+        return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
+        + self.problem.findPlan(self.findActions())
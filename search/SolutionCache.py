@@ -0,0 +1,124 @@
+from time import time
+import sqlite3
+import json
+import os
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS solutions (
+    instance TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    result INTEGER,
+    actions TEXT,
+    runtime REAL,
+    time_complexity INTEGER,
+    space_complexity INTEGER,
+    max_space_complexity INTEGER,
+    pruned INTEGER,
+    counters TEXT,
+    used REAL NOT NULL,
+    PRIMARY KEY (instance, strategy)
+);
+CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('size', 0);
+'''
+
+
+class SolutionCache:
+    def __init__(self, path, max_entries=1 << 20):
+        '''
+        Parameters: path (str): SQLite file, created if missing, max_entries
+        (integer): the number of solutions kept
+        Attributes:
+        - self.hits (integer): Lookups answered by the cache, in this process
+        - self.misses (integer): Lookups not answered, in this process
+
+        Persistent cache of solutions given to Solver(problem, ..., cache=...). An
+        entry is keyed by the canonical instance (Problem.findCanonicalKey, the same
+        for instances equal up to a permutation of the people) and the strategy with
+        its settings; it keeps the optimal cost, the plan as actions of the canonical
+        instance and the statistics of the search. When full, the least recently used
+        entries are evicted.
+
+        The database is in WAL mode so that readers never wait for a writer, and
+        writers wait for each other (busy timeout): worker processes can share the
+        file, each opening its own connection on first use
+        '''
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = None
+        self.pid = None
+
+
+    def connect(self):
+        if self.pid != os.getpid(): # never reuse a connection across fork
+            self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(SCHEMA)
+            self.pid = os.getpid()
+        return self.connection
+
+
+    def get(self, instance, strategy):
+        '''
+        Parameters: instance, strategy (str): the keys made by Solver
+        Return    : the entry (dict), None if missing
+        '''
+        connection = self.connect()
+        row = connection.execute('SELECT result, actions, runtime, time_complexity, space_complexity, '
+                                 'max_space_complexity, pruned, counters FROM solutions WHERE instance = ? AND strategy = ?',
+                                 (instance, strategy)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        connection.execute('UPDATE solutions SET used = ? WHERE instance = ? AND strategy = ?', (time(), instance, strategy))
+        result, actions, runtime, time_complexity, space_complexity, max_space_complexity, pruned, counters = row
+        return {'result': result, 'actions': json.loads(actions), 'runtime': runtime,
+                'time_complexity': time_complexity, 'space_complexity': space_complexity,
+                'max_space_complexity': max_space_complexity, 'pruned': pruned, 'counters': json.loads(counters)}
+
+
+    def put(self, instance, strategy, entry):
+        '''
+        Parameters: instance, strategy (str), entry (dict) with the keys of get()
+        '''
+        connection = self.connect()
+        values = (entry['result'], json.dumps(entry['actions']), entry['runtime'], entry['time_complexity'],
+                  entry['space_complexity'], entry['max_space_complexity'], entry['pruned'], json.dumps(entry['counters']), time())
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            updated = connection.execute('UPDATE solutions SET result = ?, actions = ?, runtime = ?, time_complexity = ?, '
+                                         'space_complexity = ?, max_space_complexity = ?, pruned = ?, counters = ?, used = ? '
+                                         'WHERE instance = ? AND strategy = ?', values + (instance, strategy)).rowcount
+            if not updated:
+                connection.execute('INSERT INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (instance, strategy) + values)
+                connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'size'")
+                size = connection.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+                if size > self.max_entries:
+                    self.evict(connection, size - self.max_entries)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+
+    def evict(self, connection, count):
+        connection.execute('DELETE FROM solutions WHERE rowid IN (SELECT rowid FROM solutions ORDER BY used LIMIT ?)', (count,))
+        connection.execute("UPDATE meta SET value = value - ? WHERE name = 'size'", (count,))
+
+
+    def __len__(self):
+        return self.connect().execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+
+
+    def close(self):
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+        self.pid = None
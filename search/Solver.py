@@ -1,25 +1,64 @@
 from .GraphSearch import GraphSearch
 from .TreeSearch import TreeSearch
+from .ExactSearch import ExactSearch
+from .VectorSearch import VectorSearch
+from .AnytimeSearch import AnytimeSearch
+from .ParallelSearch import ParallelSearch
+from .BridgeTorch import BridgeTorch
+from .LRUCache import LRUCache
+from .SearchResult import SearchResult
+from .Budget import BudgetExceeded
 
-from time import time
+from time import perf_counter
+
+
+# (algorithm, strategy) -> (engine, its method, whether it takes the heuristic id)
+STRATEGIES = {
+    ('Graph', 'UCS'): (GraphSearch, 'UniformCostSearch', False),
+    ('Graph', 'A*'): (GraphSearch, 'ASearch', True),
+    ('Graph', 'DFS'): (GraphSearch, 'DepthFirstSearch', False),
+    ('Graph', 'BFS'): (GraphSearch, 'BreathFirstSearch', False),
+    ('Graph', 'BiUCS'): (GraphSearch, 'BidirectionalSearch', False),
+    ('Tree', 'IDA*'): (TreeSearch, 'IDASearch', True),
+    ('Tree', 'BB'): (TreeSearch, 'BranchBound', True),
+    ('Tree', 'BB+'): (TreeSearch, 'ImprovedBranchBound', True),
+    ('Tree', 'SMA*'): (TreeSearch, 'MemoryBoundedSearch', True),
+    ('Exact', 'DP'): (ExactSearch, 'SortedDP', False),
+    ('Vector', 'BFS'): (VectorSearch, 'LayeredBreathFirstSearch', False),
+    ('Vector', 'UCS'): (VectorSearch, 'LayeredUniformCostSearch', False),
+    ('Anytime', 'AWA*'): (AnytimeSearch, 'AnytimeWeightedSearch', True),
+    ('Parallel', 'HDA*'): (ParallelSearch, 'HashDistributedSearch', True),
+}
 
 
 class Solver:
-    def __init__(self, problem, algorithm, strategy, heuristic_id=1):
+    def __init__(self, problem, algorithm, strategy, heuristic_id=1, cache=None, **options):
         '''
-        Parameters: problem (type Problem), algorithm (str), strategy (str)
+        Parameters: problem (type Problem), algorithm (str), strategy (str),
+        cache (SolutionCache): solutions consulted before searching, and filled,
+        options (keyword arguments passed on to the search engine, e.g. closed_set)
         Attributes: 
         - self.problem (Problem): The model of the problem
         - self.built_in (dict): The dictionary of search algorithms developed
-        - self.algorithm (str): The algorithm used (Tree or Graph)
+        - self.algorithm (str): The algorithm used (Tree, Graph, Exact, Vector, Anytime or Parallel)
         - self.strategy (str): The search strategy implemented
+        - self.options (dict): Settings of the search engine
+        - self.pruned_complexity (integer): Successors skipped by the problem's pruning
+        during the last solve, i.e. what it saved on the time complexity
+        - self.engine (GraphSearch): The search engine of the last solve, None if the
+        answer came from the cache
+        - self.cache (SolutionCache or None): The persistent cache of solutions
+        - self.actions (list): The plan of the last solve as actions of the problem,
+        None if there is none
 
         Simplify the procedure to call methods for searching. With SearchSolver(), 
-        just have to call: SearchSolver().Solve()
+        just have to call: SearchSolver().Solve(), or SearchSolver().Run() for the
+        result as an object
         '''
         self.problem = problem
-        self.built_in = {'Graph': ['UCS', 'A*', 'DFS', 'BFS'], \
-                            'Tree': ['IDA*', 'BB']}
+        self.built_in = {}
+        for algo, strat in STRATEGIES:
+            self.built_in.setdefault(algo, []).append(strat)
 
         if algorithm not in self.built_in:
             raise Exception('AlgoUndefi: The algorithm has not been built yet!')
@@ -30,81 +69,177 @@ class Solver:
         self.strategy = strategy
 
         self.heuristic_id = heuristic_id
+        self.options = options
+        self.pruned_complexity = 0
+        self.engine = None
+        self.cache = cache
+        self.actions = None
+
+    def Run(self):
+        '''
+        Parameters: None
+        Return : Result of a problem instance (SearchResult): its cost, its plan
+        (findActions) and the statistics of the search
+
+        Solve the problem using the algorithm and strategy chosen. Only the search
+        itself is timed, the plan is backtracked and formatted when asked for. With
+        options budget=Budget(...), a search stopped by the budget gives a result
+        with no solution, result.exceeded the limit hit and the statistics so far
+        '''
+        entry = self.lookupCache()
+        if entry is not None:
+            result = SearchResult(self.problem, actions=entry['actions'], cost=entry['result'])
+            result.runtime = entry['runtime']
+            result.time_complexity = entry['time_complexity']
+            result.space_complexity = entry['space_complexity']
+            result.max_space_complexity = entry['max_space_complexity']
+            result.counters = entry['counters']
+            result.pruned_complexity = entry['pruned']
+            result.cached = True
+            return result
+
+        engine, strategy, informed = STRATEGIES[self.algorithm, self.strategy]
+        solver = engine(self.problem, **self.options)
+        search = getattr(solver, strategy)
+        args = (self.heuristic_id,) if informed else ()
+        pruned = getattr(self.problem, 'pruned_successors', 0)
+        budget = self.options.get('budget')
+        if budget is not None: # the setup of the engine does not count against it
+            budget.start()
+
+        start = perf_counter()
+        try:
+            result = search(*args)
+        except BudgetExceeded as error:
+            result = SearchResult(self.problem)
+            result.exceeded = str(error)
+        end = perf_counter()
+
+        result.runtime = end - start
+        result.time_complexity = solver.time_complexity
+        result.space_complexity = solver.space_complexity
+        result.max_space_complexity = max(solver.max_space_complexity, solver.space_complexity)
+        result.counters = solver.counters
+        result.solutions = solver.solutions
+        result.pruned_complexity = getattr(self.problem, 'pruned_successors', 0) - pruned
+        self.recordSolve(solver, result)
+        return result
+
 
     def Solve(self):
         '''
         Parameters: None
         Return : Result of a problem instance after searching is complete (str)
 
-        Solve the problem using the algorithm and strategy chosen.
-        '''
-
-        if self.algorithm == 'Graph':
-            solver = GraphSearch(self.problem)
-            if self.strategy == 'BFS':
-                start = time()
-                solution = solver.BreathFirstSearch()
-                end = time()
-            elif self.strategy == 'DFS':
-                start = time()
-                solution = solver.DepthFirstSearch()
-                end = time()
-            if self.strategy == 'UCS':
-                start = time()
-                solution = solver.UniformCostSearch()
-                end = time()
-            elif self.strategy == 'A*':
-                start = time()
-                solution = solver.ASearch(self.heuristic_id)
-                end = time()
-        elif self.algorithm == 'Tree':
-            solver = TreeSearch(self.problem)
-            if self.strategy == 'IDA*':
-                start = time()
-                solution = solver.IDASearch(self.heuristic_id)
-                end = time()
-            elif self.strategy == 'BB':
-                start = time()
-                solution = solver.BranchBound(self.heuristic_id)
-                end = time()
-        
-        return f'Instance n={len(self.problem.durations)}: {self.problem.durations}; {self.problem.init_state}\n' + \
-        str(solution) + '\n' + f'Running time: {end - start}\n' + \
-        f'Time complexity: {solver.time_complexity}\n' + \
-        f'Space complexity: {solver.space_complexity}\n' + \
-        f'Max space complexity: {solver.max_space_complexity}'
+        Same as Run() but formatted
+        '''
+        result = self.Run()
+        report = f'\nPruned complexity: {result.pruned_complexity}' if getattr(self.problem, 'pruning', False) else ''
+        report += ''.join(f'\n{name}: {value}' for name, value in result.counters.items())
+        report += ''.join(f'\nSolution {rank} at {seconds:.6f}s: {cost} (bound {bound:.4f})'
+                          for rank, (seconds, cost, bound) in enumerate(result.solutions, 1))
+        report += f'\nBudget exceeded: {result.exceeded}' if result.exceeded is not None and result.cost is not None else ''
+        report += '\nCache: hit' if result.cached else ''
+
+        return f'Instance n={len(self.problem.durations)}: {self.problem.durations}; {self.problem.decodeState(self.problem.init_state)}\n' + \
+        str(result) + '\n' + f'Running time: {result.runtime}\n' + \
+        f'Time complexity: {result.time_complexity}\n' + \
+        f'Space complexity: {result.space_complexity}\n' + \
+        f'Max space complexity: {result.max_space_complexity}' + report
     
 
     def StatsSolve(self):
-        if self.algorithm == 'Graph':
-            solver = GraphSearch(self.problem)
-            if self.strategy == 'BFS':
-                start = time()
-                solution = solver.BreathFirstSearch()
-                end = time()
-            elif self.strategy == 'DFS':
-                start = time()
-                solution = solver.DepthFirstSearch()
-                end = time()
-            elif self.strategy == 'UCS':
-                start = time()
-                solution = solver.UniformCostSearch()
-                end = time()
-            elif self.strategy == 'A*':
-                start = time()
-                solution = solver.ASearch(self.heuristic_id)
-                end = time()
-        elif self.algorithm == 'Tree':
-            solver = TreeSearch(self.problem)
-            if self.strategy == 'IDA*':
-                start = time()
-                solution = solver.IDASearch(self.heuristic_id)
-                end = time()
-            elif self.strategy == 'BB':
-                start = time()
-                solution = solver.BranchBound(self.heuristic_id)
-                end = time()
-        
-        runtime = end - start
-        return solver.result, runtime, solver.time_complexity, solver.max_space_complexity
+        '''
+        Parameters: None
+        Return : (result, running time, time complexity, max space complexity)
+
+        Same as Run() but for sampling. The successors skipped by pruning are left
+        in self.pruned_complexity
+        '''
+        result = self.Run()
+        return result.cost, result.runtime, result.time_complexity, result.max_space_complexity
+
+
+    def findCacheKeys(self):
+        '''
+        Return: (instance, strategy) keys of self.cache (str), None if the solve
+        must not be cached (no cache, an instrumented search, or a search with a
+        time limit, whose result depends on the machine). A budget is not part of
+        the keys: only the solves it did not stop are stored
+        '''
+        if self.cache is None or self.options.get('instrument') is not None \
+            or self.options.get('time_limit') is not None:
+            return None
+        settings = sorted((name, repr(value)) for name, value in self.options.items() if name != 'budget')
+        return repr(self.problem.findCanonicalKey()), f'{self.algorithm}/{self.strategy}/{self.heuristic_id}/{settings}'
+
+
+    def lookupCache(self):
+        '''
+        Return: the cached entry of the solve (dict), None if missing
+        '''
+        keys = self.findCacheKeys()
+        if keys is None:
+            return None
+        entry = self.cache.get(*keys)
+        if entry is not None:
+            self.engine = None
+            self.pruned_complexity = entry['pruned']
+            self.actions = entry['actions']
+        return entry
+
+
+    def recordSolve(self, solver, result):
+        '''
+        Keep the engine, the pruned complexity and the plan of a solve, and store
+        them in the cache
+        '''
+        self.engine = solver
+        self.pruned_complexity = result.pruned_complexity
+        self.actions = result.findActions()
+
+        keys = self.findCacheKeys()
+        if keys is not None and result.exceeded is None:
+            self.cache.put(*keys, {'result': result.cost, 'actions': self.actions, 'runtime': result.runtime,
+                                   'time_complexity': result.time_complexity, 'space_complexity': result.space_complexity,
+                                   'max_space_complexity': result.max_space_complexity,
+                                   'pruned': result.pruned_complexity, 'counters': result.counters})
+
+
+    @staticmethod
+    def BatchSolve(instances, algorithm, strategy, heuristic_id=1, problem_options=None,
+                   cache_size=1 << 16, **options):
+        '''
+        Parameters: instances (iterable of (durations, init_state), the arguments of
+        BridgeTorch), algorithm, strategy, heuristic_id and options as for Solver(),
+        problem_options (dict): keyword arguments of every BridgeTorch, cache_size
+        (integer): number of canonical instances remembered
+        Return : generator of (result, method) for each instance, in input order
+
+        Solve many instances, each distinct one once. BridgeTorch already numbers
+        the people by rank (ascending duration), so instances equal up to a
+        permutation of the people have the same walk times and the same initial
+        state in rank space, and share the plan found for the first of them: its
+        actions are masks of ranks, only printed with the numbering of each
+        instance. Instances with the same walk times share their heuristic tables.
+        method is '' when there is no solution
+        '''
+        problem_options = problem_options or {}
+        solved = LRUCache(cache_size) # canonical instance -> (result, actions)
+        twins = LRUCache(cache_size) # walk times -> heuristic tables of the last instance solved with them
+        for instance in instances:
+            problem = BridgeTorch(*instance, **problem_options)
+            walktimes = tuple(problem.walktimes)
+            key = problem.findCanonicalKey()
+            answer = solved.get(key)
+            if answer is None:
+                tables = twins.get(walktimes)
+                if tables is not None:
+                    problem.shareHeuristic(tables)
+                solver = Solver(problem, algorithm, strategy, heuristic_id, **options)
+                answer = (solver.StatsSolve()[0], solver.actions)
+                solved.put(key, answer)
+                twins.put(walktimes, problem.findHeuristicTables()) # with those built by the solve
 
+            result, actions = answer
+            yield result, problem.findPlan(actions) if actions is not None else ''
@@ -1,69 +1,127 @@
 from .GraphSearch import GraphSearch
+from .Node import Node
+from .MemoryNode import MemoryNode
+from .LRUCache import LRUCache
+
+import heapq
+
+
+INF = float('inf')
 
 
 class TreeSearch(GraphSearch):
-    def __init__(self, problem):
+    def __init__(self, problem, transposition_size=0, memory_size=1 << 16, **options):
         '''
+        Parameters: problem (type Problem), transposition_size (integer): capacity of
+        the transposition table of IDA*, 0 to search without one, memory_size
+        (integer): nodes SMA* may hold
+
         Inherit from GraphSearch(), except self.explored is none since tree search
-        does not memorize what it have expanded
+        does not memorize what it have expanded. Only the bounded transposition table,
+        self.transposition (LRUCache or None), may keep states for IDA*
 
         Formulate the tree for searching. The way of formulation is replied on the 
         each problem. In our scope, it is Bridge and Torch.
         '''
 
-        GraphSearch.__init__(self, problem)
-        self.explored = None
+        options['closed_set'] = None
+        GraphSearch.__init__(self, problem, **options)
+        self.fringe = [self.root_node]
+        self.transposition = LRUCache(transposition_size) if transposition_size else None
+        self.memory_size = memory_size
+        if self.transposition is not None:
+            self.counters = {'Transposition cuts': 0}
   
 
     def IDASearch(self, heuristic_id = 1):
         '''
         Tree search using strategy IDA search
         Return solution if it find one, o.w return a failure
+
+        Depth first search bounded by f = g + h, with a bound raised to the lowest f
+        beyond it until a goal is reached. The path is kept in self.fringe and the
+        children still to visit of each node of it in a stack, so the depth is not
+        limited by the recursion of Python. With a transposition table, a state met
+        again in the same iteration with a path cost not lower than before is cut
         '''
+        problem = self.problem
+        fringe = self.fringe
+        table = self.transposition
+
+        self.root_node.setHeuristic(problem, heuristic_id)
+        threshold = self.root_node.heuristic + self.root_node.path_cost
+        while fringe:
+            found = problem.testGoal(self.root_node.state)
+            if not found:
+                if table is not None:
+                    table.put(self.root_node.state, (0, threshold))
+                pending = [iter(self.expandNode(self.root_node))]
+                lowest = [INF]
 
-        def search(fringe, threshold):
-            node = fringe[-1]
-            if node.path_cost + node.heuristic > threshold:
-                return node.path_cost + node.heuristic
-            if self.problem.testGoal(node.state):
-                return "FOUND"
-            min = 1e15 # INF
-            child_nodes = self.expandNode(node)
-            for succ in child_nodes:
-                succ.setHeuristic(heuristic_id)
-                fringe.append(succ)
-                t = search(fringe, threshold)
-                if t == "FOUND":
-                    return "FOUND"
-                if t < min:
-                    min = t
-                fringe.pop()
+            while not found and pending:
+                succ = next(pending[-1], None)
+                if succ is None: # every child visited, give the lowest f beyond to the parent
+                    pending.pop()
+                    t = lowest.pop()
+                    if not pending:
+                        break
+                    fringe.pop()
+                else:
+                    succ.setHeuristic(problem, heuristic_id)
+                    f = succ.path_cost + succ.heuristic
+                    if f > threshold:
+                        t = f
+                    elif problem.testGoal(succ.state):
+                        fringe.append(succ)
+                        found = True
+                        break
+                    elif table is not None and self.isTransposed(succ, threshold):
+                        t = INF
+                    else:
+                        fringe.append(succ)
+                        pending.append(iter(self.expandNode(succ)))
+                        lowest.append(INF)
+                        continue
+
+                if t < lowest[-1]:
+                    lowest[-1] = t
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
                 self.space_complexity -= 1
-            return min
-        
-        self.root_node.setHeuristic(heuristic_id)
-        threshold = self.root_node.heuristic + self.root_node.path_cost
-        while self.fringe: 
-            t = search(self.fringe, threshold)
-            if t == "FOUND":
-                node = self.fringe[-1]
+
+            if found:
+                node = fringe[-1]
                 self.result = node.path_cost
+                self.goal_node = node
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(node)}\nOverall duration: {node.path_cost}\n' \
-                + str(self.problem.findSolution(node))
-            if t == 1e15:
+                return self.findResult()
+            if t == INF:
                 self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
-                return "Status: Solution not found\n"
+                return self.findResult()
             threshold = t
             self.space_complexity = 1
+
+
+    def isTransposed(self, node, threshold):
+        '''
+        Parameters: node (type Node), threshold (integer)
+        Return    : whether the subtree of node was already searched (boolean)
+
+        True if the state was reached before in the iteration of this threshold with
+        a path cost not higher, o.w record the path cost of node in the table
+        '''
+        entry = self.transposition.get(node.state)
+        if entry is not None and entry[1] == threshold and entry[0] <= node.path_cost:
+            self.counters['Transposition cuts'] += 1
+            return True
+        self.transposition.put(node.state, (node.path_cost, threshold))
+        return False
     
 
     def BranchBound(self, heuristic_id = 1):
         def Branch(node):
             nonlocal f_opt, x_opt
             for succ in self.expandNode(node):
-                succ.setHeuristic(heuristic_id)
+                succ.setHeuristic(self.problem, heuristic_id)
                 if self.problem.testGoal(succ.state) and succ.heuristic + succ.path_cost < f_opt:
                     f_opt = succ.heuristic + succ.path_cost
                     x_opt = succ
@@ -76,21 +134,267 @@ class TreeSearch(GraphSearch):
         
         f_opt = 1e15
         x_opt = None
-        self.root_node.setHeuristic(heuristic_id)
+        self.root_node.setHeuristic(self.problem, heuristic_id)
 
         if self.problem.testGoal(self.root_node.state):
             x_opt = self.root_node
             self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
             self.result = x_opt.path_cost
-            return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(x_opt)}\nOverall duration: {x_opt.path_cost}\n' \
-            + str(self.problem.findSolution(x_opt))
+            self.goal_node = x_opt
+            return self.findResult()
 
         Branch(self.root_node)
         if x_opt == None:
-            return 'Status: Solution not found\n'
+            return self.findResult()
 
         self.space_complexity += x_opt.depth
         self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
         self.result = x_opt.path_cost
-        return f'Status: Solution found\nOPTIMAL: {self.problem.checkObjective(x_opt)}\nOverall duration: {x_opt.path_cost}\n' \
-        + str(self.problem.findSolution(x_opt))
+        self.goal_node = x_opt
+        return self.findResult()
+
+
+    def findGreedyPlan(self, heuristic_id = 1):
+        '''
+        Parameters: heuristic_id (integer)
+        Return    : a goal node (type Node), None if the greedy walk gets stuck
+
+        Walk from the root to the child of lowest f = g + h, never back to a state
+        already on the walk. Cheap and usually close to the optimum, it gives the
+        first incumbent of ImprovedBranchBound
+        '''
+        problem = self.problem
+        node = self.root_node
+        visited = {node.state}
+        while not problem.testGoal(node.state):
+            self.checkBudget()
+            best = None
+            for action, result_state in problem.findSuccessorFn(node.state):
+                self.time_complexity += 1
+                if result_state in visited:
+                    continue
+                succ = Node(problem, result_state, node, action)
+                succ.setHeuristic(problem, heuristic_id)
+                if best is None or succ.path_cost + succ.heuristic < best.path_cost + best.heuristic:
+                    best = succ
+            if best is None:
+                return None
+            node = best
+            visited.add(node.state)
+        return node
+
+
+    def ImprovedBranchBound(self, heuristic_id = 1):
+        '''
+        Tree search using strategy Branch and bound, started from the greedy plan as
+        incumbent. Children are visited by increasing f = g + h, and a node is cut
+        if its f is not lower than the incumbent ('Bound cuts') or if its state was
+        already expanded with a path cost not higher ('Cache cuts'). The path is
+        kept with the children still to visit of each of its nodes in a stack, as
+        in IDASearch
+        Return solution if it find one, o.w return a failure
+        '''
+        problem = self.problem
+        self.counters = {'Bound cuts': 0, 'Cache cuts': 0}
+        best_g = {} # state -> lowest path cost it was expanded with
+
+        self.root_node.setHeuristic(problem, heuristic_id)
+        if problem.testGoal(self.root_node.state):
+            x_opt = self.root_node
+        else:
+            x_opt = self.findGreedyPlan(heuristic_id)
+        f_opt = x_opt.path_cost if x_opt else INF
+
+        if x_opt is not self.root_node:
+            best_g[self.root_node.state] = 0
+            pending = [iter(self.orderChildren(self.root_node, heuristic_id))]
+            while pending:
+                succ = next(pending[-1], None)
+                if succ is None: # every child visited
+                    pending.pop()
+                    if not pending:
+                        break
+                elif succ.path_cost + succ.heuristic >= f_opt: # so are the next siblings
+                    siblings = len(list(pending[-1]))
+                    self.counters['Bound cuts'] += 1 + siblings
+                    self.space_complexity -= siblings
+                elif problem.testGoal(succ.state):
+                    f_opt = succ.path_cost + succ.heuristic
+                    x_opt = succ
+                elif succ.path_cost >= best_g.get(succ.state, INF):
+                    self.counters['Cache cuts'] += 1
+                else:
+                    best_g[succ.state] = succ.path_cost
+                    pending.append(iter(self.orderChildren(succ, heuristic_id)))
+                    continue
+                self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+                self.space_complexity -= 1
+
+        if x_opt == None:
+            self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+            return self.findResult()
+
+        self.space_complexity += x_opt.depth
+        self.max_space_complexity = max(self.max_space_complexity, self.space_complexity)
+        self.result = x_opt.path_cost
+        self.goal_node = x_opt
+        return self.findResult()
+
+
+    def orderChildren(self, node, heuristic_id = 1):
+        '''
+        Return: the children of node (list) by increasing f = g + h
+        '''
+        child_nodes = self.expandNode(node)
+        for succ in child_nodes:
+            succ.setHeuristic(self.problem, heuristic_id)
+        child_nodes.sort(key=lambda succ: succ.path_cost + succ.heuristic)
+        return child_nodes
+
+
+    def MemoryBoundedSearch(self, heuristic_id = 1):
+        '''
+        Tree search using strategy Simplified memory-bounded A* (SMA*): best first on
+        f = g + h, the deepest node first on ties, holding at most self.memory_size
+        nodes. When the memory is full the leaf of highest f (the shallowest on ties)
+        is forgotten, its f backed up into its parent, which regenerates it once that
+        value is the lowest again: the expansions of the nodes regenerated and of their
+        descendants are the 'Re-expansions', the price of the memory cap. A node as deep as the memory
+        allows cannot get children, and a successor whose state is in memory with a
+        path cost not higher is not generated ('Duplicate cuts'): the one in memory
+        stands for it, in memory or backed up if forgotten. The plan is optimal
+        whenever the path to an optimal goal fits in memory; a memory too small for
+        the shortest plan (Problem.findDepthBound) is refused up front. The budget
+        counts the expansions, not the steps backing up or regenerating a successor
+        Return solution if it find one, o.w return a failure
+        '''
+        problem = self.problem
+        instrument = self.instrument
+        capacity = self.memory_size
+        depth = problem.findDepthBound(self.root_node.state)
+        if depth is not None and capacity < depth + 1:
+            raise Exception(f'Invalid memory size! SMA* needs {depth + 1} nodes at least to hold a plan of this instance.')
+        heappush, heappop = self.timeFrontier(heapq.heappush), self.timeFrontier(heapq.heappop)
+        fringe = self.fringe = [] # heap of (f of the next successor, -depth, tie, version, node)
+        leaves = [] # heap of (-f, depth, tie, version, node), the nodes without child in memory
+        held = {} # state -> its node of lowest path cost in memory
+        tie = 0
+        stored = 1
+        goal = None
+        self.counters = {'Memory cap': capacity, 'Expansions': 0, 'Re-expansions': 0, 'Evictions': 0, 'Duplicate cuts': 0}
+
+        def push(node):
+            nonlocal tie
+            node.version += 1
+            key = node.findKey()
+            if key < INF:
+                heappush(fringe, (key, -node.depth, tie, node.version, node))
+            if not node.children and node.parent is not None:
+                heappush(leaves, (-node.f, node.depth, tie, node.version, node))
+            tie += 1
+
+        def backup(node):
+            # f of a node is the lowest estimate of its successors, up to the root
+            while node is not None and node.successors is not None:
+                f = min(node.estimates) if node.estimates else INF
+                if f == node.f:
+                    break
+                node.f = f
+                if node.parent is not None:
+                    node.parent.estimates[node.index] = f
+                push(node)
+                node = node.parent
+
+        def evict(kept):
+            # forget the worst leaf but kept, the node just generated
+            skipped = []
+            while leaves:
+                entry = heappop(leaves)
+                leaf = entry[4]
+                if entry[3] != leaf.version or leaf.children:
+                    continue
+                if leaf is kept:
+                    skipped.append(entry)
+                    continue
+                parent = leaf.parent
+                parent.estimates[leaf.index] = leaf.f
+                del parent.children[leaf.index]
+                leaf.version = -1 # out of memory, every entry of it is stale
+                if held.get(leaf.state) is leaf:
+                    del held[leaf.state]
+                self.counters['Evictions'] += 1
+                push(parent)
+                break
+            else:
+                leaf = None
+            for entry in skipped:
+                heappush(leaves, entry)
+            return leaf is not None
+
+        state = self.root_node.state
+        h = problem.findHeuristic(state, heuristic_id)
+        root = MemoryNode(state, None, -1, None, 0, h, h)
+        held[state] = root
+        push(root)
+        while fringe:
+            _, _, _, version, node = heappop(fringe)
+            if version != node.version:
+                continue
+            if problem.testGoal(node.state):
+                goal = node
+                break
+
+            if node.successors is None:
+                self.checkBudget()
+                self.counters['Expansions'] += 1
+                self.counters['Re-expansions'] += node.again
+                node.successors = []
+                for action, result_state in problem.findSuccessorFn(node.state):
+                    self.time_complexity += 1
+                    g = node.g + problem.findStepCost(action)
+                    h = problem.findChildHeuristic(node.state, node.h, action, result_state, heuristic_id)
+                    node.successors.append((action, result_state, g, h))
+                node.estimates = [max(node.f, g + h) for _, _, g, h in node.successors] # pathmax
+                if not node.estimates:
+                    backup(node)
+                    push(node)
+                    continue
+
+            index = node.findNext()
+            action, result_state, g, h = node.successors[index]
+            again = node.generated >> index & 1
+            node.generated |= 1 << index
+            other = held.get(result_state)
+            duplicate = other is not None and other.g <= g
+            if duplicate or node.depth + 2 >= capacity and not problem.testGoal(result_state): # no room for its children
+                self.counters['Duplicate cuts'] += duplicate
+                if duplicate and instrument is not None:
+                    instrument.emit('duplicate', result_state)
+                node.estimates[index] = INF
+                backup(node)
+                push(node)
+                continue
+
+            child = MemoryNode(result_state, node, index, action, g, h, node.estimates[index])
+            child.again = child.again or bool(again)
+            node.children[index] = child
+            held[result_state] = child
+            stored += 1
+            push(child)
+            backup(node)
+            push(node)
+            if stored > capacity and evict(child):
+                stored -= 1
+            self.space_complexity = stored
+            self.max_space_complexity = max(self.max_space_complexity, stored)
+
+        if goal is None:
+            return self.findResult()
+
+        self.result = goal.g
+        actions = []
+        while goal.parent is not None:
+            actions.append(goal.action)
+            goal = goal.parent
+        self.goal_actions = actions[::-1]
+        return self.findResult()
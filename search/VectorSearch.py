@@ -0,0 +1,206 @@
+from .GraphSearch import GraphSearch
+
+import heapq
+
+try:
+    import numpy as np
+except ImportError: # optional, only needed by this engine
+    np = None
+
+
+STATE_LIMIT = 1 << 27 # largest state space held in the dense arrays
+BLOCK = 1 << 12 # states expanded together against every pair
+
+
+class VectorSearch(GraphSearch):
+    def __init__(self, problem, **options):
+        '''
+        Inherit from GraphSearch(), without closed set since the states reached are
+        held in dense NumPy arrays indexed by the state itself:
+        - self.cost: Path cost of each state, -1 if not reached
+        - self.parent: State it was reached from
+        - self.action: Action it was reached by
+
+        Strategies expanding a whole layer of states (the same depth, or the same
+        path cost) at once with bitwise operations on arrays of packed states, for
+        Bridge and Torch only. They search the plain set of moves: the symmetry and
+        pruning options of the problem are not used. Needs NumPy.
+        '''
+        if np is None:
+            raise Exception('NumpUndefi: The vector search needs NumPy, install it with: pip install numpy')
+        if problem.countStates() > STATE_LIMIT:
+            raise Exception('Invalid problem! Too many people for the vector search.')
+
+        options['closed_set'] = None
+        GraphSearch.__init__(self, problem, **options)
+
+        n = len(problem.walktimes)
+        self.walktimes = np.array(problem.walktimes, dtype=np.int64)
+        self.singles = np.array([1 << rank for rank in range(n)], dtype=np.int64)
+        pairs = [(x, y) for y in range(n) for x in range(y)]
+        self.pairs = np.array([1 << x | 1 << y for x, y in pairs], dtype=np.int64)
+        self.pair_costs = np.array([problem.walktimes[y] for _, y in pairs], dtype=np.int64)
+        self.popcounts = np.array([bin(word).count('1') for word in range(1 << 16)], dtype=np.int64)
+
+        size = problem.countStates()
+        self.cost = np.full(size, -1, dtype=np.int64)
+        self.parent = np.full(size, -1, dtype=np.int64)
+        self.action = np.zeros(size, dtype=np.int64)
+
+
+    def countPeople(self, states):
+        '''
+        Return: the number of people on the side 1 of each state (array)
+        '''
+        people = self.problem.people
+        counted = np.zeros(len(states), dtype=np.int64)
+        shift = 0
+        while people >> shift:
+            counted += self.popcounts[(states & people) >> shift & 0xFFFF]
+            shift += 16
+        return counted
+
+
+    def expandLayer(self, layer):
+        '''
+        Parameters: layer (array of states)
+        Return    : (states, parents, actions, step costs) of every move from the
+        layer (arrays)
+        '''
+        problem = self.problem
+        torch = problem.torch
+        states, parents, actions, costs = [], [], [], []
+
+        # the candle is on the side 1: one person walks it back
+        back = layer[layer & torch != 0]
+        rows, cols = np.nonzero(back[:, None] & self.singles[None, :])
+        states.append(back[rows] ^ self.singles[cols] ^ torch)
+        parents.append(back[rows])
+        actions.append(self.singles[cols])
+        costs.append(self.walktimes[cols])
+
+        forth = layer[layer & torch == 0]
+        left = len(self.singles) - self.countPeople(forth)
+        last = forth[left == 1] # the last person crosses alone
+        alone = problem.people & ~last
+        states.append(last | alone | torch)
+        parents.append(last)
+        actions.append(alone)
+        costs.append(self.walktimes[np.searchsorted(self.singles, alone)])
+
+        forth = forth[left >= 2]
+        for start in range(0, len(forth), BLOCK): # two people cross
+            block = forth[start:start + BLOCK]
+            rows, cols = np.nonzero(block[:, None] & self.pairs[None, :] == 0)
+            states.append(block[rows] | self.pairs[cols] | torch)
+            parents.append(block[rows])
+            actions.append(self.pairs[cols])
+            costs.append(self.pair_costs[cols])
+
+        return np.concatenate(states), np.concatenate(parents), np.concatenate(actions), np.concatenate(costs)
+
+
+    def keepCheapest(self, states, parents, actions, costs, improve=True):
+        '''
+        Return: the moves reaching a state not reached yet, or more cheaply if improve,
+        the cheapest one for each state (arrays)
+        '''
+        known = self.cost[states]
+        better = (known < 0) | (costs < known) if improve else known < 0
+        states, parents, actions, costs = states[better], parents[better], actions[better], costs[better]
+        order = np.lexsort((costs, states))
+        _, first = np.unique(states[order], return_index=True)
+        chosen = order[first]
+        return states[chosen], parents[chosen], actions[chosen], costs[chosen]
+
+
+    def findGoal(self, layer):
+        '''
+        Return: the cheapest goal state of the layer, None if there is none
+        '''
+        problem = self.problem
+        goals = layer[layer | problem.torch == problem.goal]
+        if not len(goals):
+            return None
+        return int(goals[np.argmin(self.cost[goals])])
+
+
+    def solveLayers(self, next_layer, improve=True):
+        '''
+        Parameters: next_layer (function): from the states (array) reached by a layer
+        and their path costs (array), the next layer to expand (array), None when
+        done, improve (boolean): whether a state reached already may get a cheaper
+        path
+        Return    : solution if it find one, o.w return a failure
+        '''
+        problem = self.problem
+        start = problem.init_state
+        self.cost[start] = 0
+        layer = np.array([start], dtype=np.int64)
+        reached = 1
+        while layer is not None:
+            goal = self.findGoal(layer) if len(layer) else None
+            if goal is not None:
+                actions = []
+                state = goal
+                while state != start:
+                    actions.append(int(self.action[state]))
+                    state = int(self.parent[state])
+                self.result = int(self.cost[goal])
+                self.goal_actions = actions[::-1]
+                self.space_complexity = self.max_space_complexity = reached
+                return self.findResult()
+
+            self.space_complexity = reached
+            self.checkBudget(len(layer))
+            moves = self.expandLayer(layer)
+            self.time_complexity += len(moves[0])
+            states, parents, actions, costs = self.keepCheapest(moves[0], moves[1], moves[2], self.cost[moves[1]] + moves[3], improve)
+            reached += int(np.count_nonzero(self.cost[states] < 0))
+            self.cost[states] = costs
+            self.parent[states] = parents
+            self.action[states] = actions
+            layer = next_layer(states, costs)
+
+        self.space_complexity = self.max_space_complexity = reached
+        return self.findResult()
+
+
+    def LayeredBreathFirstSearch(self):
+        '''
+        Breath first search expanding a whole depth at once. A state is only reached
+        from the first layer meeting it, by its cheapest move: among the plans of
+        the lowest number of trips, the cheapest is returned
+        Return solution if it find one, o.w return a failure
+        '''
+        return self.solveLayers(lambda states, costs: states if len(states) else None, improve=False)
+
+
+    def LayeredUniformCostSearch(self):
+        '''
+        Uniform cost search expanding all the states of the same path cost at once
+        (Dial's buckets of states)
+        Return solution if it find one, o.w return a failure
+        '''
+        buckets = {} # path cost -> arrays of states pushed with it
+        pending = [] # heap of those path costs
+        expanded = np.zeros(len(self.cost), dtype=bool)
+        expanded[self.problem.init_state] = True
+
+        def next_layer(states, costs):
+            for value in np.unique(costs).tolist():
+                if value not in buckets:
+                    buckets[value] = []
+                    heapq.heappush(pending, value)
+                buckets[value].append(states[costs == value])
+
+            while pending:
+                value = heapq.heappop(pending)
+                layer = np.unique(np.concatenate(buckets.pop(value)))
+                layer = layer[(self.cost[layer] == value) & ~expanded[layer]] # stale copies out
+                if len(layer):
+                    expanded[layer] = True
+                    return layer
+            return None
+
+        return self.solveLayers(next_layer)
@@ -1,7 +1,21 @@
+from .AnytimeSearch import AnytimeSearch
 from .BridgeTorch import BridgeTorch
+from .Budget import Budget, BudgetExceeded, CancellationToken
+from .ClosedSet import BitmapClosedSet, HashClosedSet
+from .ExactSearch import ExactSearch
+from .Frontier import BucketFrontier, FIFOFrontier, HeapFrontier, LIFOFrontier
 from .GraphSearch import GraphSearch
+from .Instrumentation import Instrumentation
+from .LRUCache import LRUCache
+from .MemoryNode import MemoryNode
 from .Node import Node
+from .NodeArena import NodeArena
+from .ParallelSearch import ParallelSearch
+from .PatternDatabase import PatternDatabase, loadPatternDatabase
 from .Problem import Problem
 from .Root import Root
+from .SearchResult import SearchResult
+from .SolutionCache import SolutionCache
 from .Solver import Solver
-from .TreeSearch import TreeSearch
\ No newline at end of file
+from .TreeSearch import TreeSearch
+from .VectorSearch import VectorSearch
\ No newline at end of file
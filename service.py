@@ -0,0 +1,342 @@
+'''
+Long running solve service, the Solver behind a JSON-lines protocol:
+
+    python service.py                     # requests on stdin, results on stdout
+    python service.py --port 8765         # or on a local TCP socket
+    python service.py --unix bridge.sock  # or on a Unix socket
+
+One request per line, every field but durations and init_state optional:
+
+    {"id": 1, "durations": "1 2 5 8", "init_state": "0 0 0 0 0",
+     "algorithm": "Graph", "strategy": "A*", "heuristic": 2,
+     "budget": {"time_limit": 10, "max_expansions": 1000000, "max_space": null},
+     "options": {"closed_set": "bitmap"}}
+
+and one result per line, in the order the solves complete, with the id of its
+request: status ('ok', 'not found', 'budget exceeded (<limit>)' or 'error'), cost,
+plan (the people crossing at each trip), the statistics of the search and the
+latency (seconds from receipt to answer). {"command": "stats"} is answered with
+the throughput and latency percentiles so far, also printed on stderr every
+--report-every seconds and on exit.
+
+The solves run in a pool of worker processes started up front. Requests wait in a
+queue of --max-queue entries: when it is full, the service stops reading its
+input until a worker frees a place, so a fast client is slowed down instead of
+filling the memory.
+'''
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from time import perf_counter
+import asyncio
+import argparse
+import json
+import math
+import stat
+import sys
+import os
+
+import search
+
+
+# state of a worker process, set by initWorker
+CACHE = None
+TWINS = search.LRUCache(256) # walk times -> heuristic tables of the last problem solved with them
+
+
+def initWorker(cache_path=None):
+    global CACHE
+    CACHE = search.SolutionCache(cache_path) if cache_path else None
+
+
+def warmUp():
+    return os.getpid()
+
+
+def solveRequest(request, default_budget=None):
+    '''
+    Parameters: request (dict), default_budget (dict): limits of the Budget, those
+    of the request override them
+    Return    : the result of the request (dict), run in a worker process
+    '''
+    response = {'id': request.get('id')}
+    try:
+        durations, init_state = request['durations'], request['init_state']
+        if not isinstance(durations, str):
+            durations = ' '.join(map(str, durations))
+        if not isinstance(init_state, str):
+            init_state = ' '.join(map(str, init_state))
+        problem = search.BridgeTorch(durations, init_state)
+        walktimes = tuple(problem.walktimes)
+        tables = TWINS.get(walktimes)
+        if tables is not None:
+            problem.shareHeuristic(tables)
+
+        limits = dict(default_budget or {})
+        limits.update(request.get('budget') or {})
+        solver = search.Solver(problem, request.get('algorithm', 'Graph'), request.get('strategy', 'A*'),
+                               request.get('heuristic', 2), cache=CACHE, budget=search.Budget(**limits),
+                               **(request.get('options') or {}))
+        result = solver.Run()
+        TWINS.put(walktimes, problem.findHeuristicTables()) # with those built by the solve
+    except Exception as error:
+        response.update(status='error', error=str(error))
+        return response
+
+    if result.exceeded is not None and result.cost is None:
+        status = f'budget exceeded ({result.exceeded})'
+    else:
+        status = 'ok' if result.cost is not None else 'not found'
+    actions = result.findActions()
+    response.update(status=status, cost=result.cost,
+                    plan=[[person + 1 for person in problem.decodeAction(action)] for action in actions] if actions is not None else None,
+                    runtime=result.runtime, time_complexity=result.time_complexity,
+                    max_space_complexity=result.max_space_complexity, counters=result.counters, cached=result.cached)
+    return response
+
+
+def makeFinite(value):
+    '''
+    Return: value with its infinite and NaN floats (e.g. the suboptimality bound
+    of AWA* without a solution) turned to None, which JSON has no literal for
+    '''
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: makeFinite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [makeFinite(item) for item in value]
+    return value
+
+
+def encodeLine(response):
+    '''
+    Return: response (dict) as one line of strict JSON
+    '''
+    return json.dumps(makeFinite(response), allow_nan=False) + '\n'
+
+
+class Stats:
+    def __init__(self, window=10000):
+        '''
+        Parameters: window (integer): number of latest latencies the percentiles
+        are taken from
+        '''
+        self.start = perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.completed = 0
+        self.errors = 0
+
+
+    def add(self, latency, status):
+        self.latencies.append(latency)
+        self.completed += 1
+        if status == 'error':
+            self.errors += 1
+
+
+    def report(self, queued=0):
+        '''
+        Return: completed requests, errors, throughput (per second) and latency
+        percentiles (seconds) (dict)
+        '''
+        latencies = sorted(self.latencies)
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+        elapsed = perf_counter() - self.start
+        return {'completed': self.completed, 'errors': self.errors, 'queued': queued,
+                'throughput': self.completed / elapsed if elapsed else 0.0,
+                'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99), 'max': percentile(1)}
+
+
+class Service:
+    def __init__(self, workers=None, max_queue=64, cache_path=None, default_budget=None):
+        '''
+        Parameters: workers (integer): processes solving, the number of CPUs by
+        default, max_queue (integer): requests waiting for a worker before the input
+        is not read any more, cache_path (str): SolutionCache shared by the workers,
+        default_budget (dict): limits of every solve
+        '''
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cache_path = cache_path
+        self.default_budget = default_budget or {}
+        self.stats = Stats()
+        self.pool = None
+        self.queue = None
+        self.tasks = []
+
+
+    async def start(self):
+        '''
+        Start the worker processes, so the first requests do not wait for them
+        '''
+        loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue(self.max_queue)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=initWorker, initargs=(self.cache_path,))
+        await asyncio.gather(*[loop.run_in_executor(self.pool, warmUp) for _ in range(self.workers)])
+        self.tasks = [loop.create_task(self.dispatch()) for _ in range(self.workers)]
+
+
+    async def dispatch(self):
+        '''
+        Loop feeding one worker with the queued requests
+        '''
+        loop = asyncio.get_event_loop()
+        while True:
+            received, request, future = await self.queue.get()
+            try:
+                response = await loop.run_in_executor(self.pool, solveRequest, request, self.default_budget)
+            except Exception as error: # the worker died
+                response = {'id': request.get('id'), 'status': 'error', 'error': repr(error)}
+            response['latency'] = perf_counter() - received
+            self.stats.add(response['latency'], response['status'])
+            future.set_result(response)
+            self.queue.task_done()
+
+
+    async def submit(self, line):
+        '''
+        Parameters: line (str): a request
+        Return    : future of its response (dict), once the request is queued
+        '''
+        received = perf_counter()
+        future = asyncio.get_event_loop().create_future()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request is a JSON object')
+        except ValueError as error:
+            response = {'id': None, 'status': 'error', 'error': f'Invalid request! {error}',
+                        'latency': perf_counter() - received}
+            self.stats.add(response['latency'], response['status']) # answered like any other
+            future.set_result(response)
+            return future
+
+        if request.get('command') == 'stats':
+            future.set_result(dict(self.stats.report(self.queue.qsize()), id=request.get('id')))
+        else:
+            await self.queue.put((received, request, future)) # waits while the queue is full
+        return future
+
+
+    async def serve(self, readline, write):
+        '''
+        Parameters: readline (coroutine function): the next line, '' at the end,
+        write (coroutine function): send a line
+
+        Answer the requests of one input until its end, each as soon as solved
+        '''
+        replies = set()
+        async def reply(future):
+            await write(encodeLine(await future))
+
+        while True:
+            line = await readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(reply(await self.submit(line)))
+                replies.add(task)
+                task.add_done_callback(replies.discard)
+        if replies:
+            await asyncio.wait(list(replies))
+
+
+    async def serveStdin(self):
+        loop = asyncio.get_event_loop()
+        async def readline(): # in a thread: pipes are not asynchronous on every platform
+            return await loop.run_in_executor(None, sys.stdin.readline)
+        async def write(line):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        await self.serve(readline, write)
+
+
+    async def handleClient(self, reader, writer):
+        async def write(line):
+            writer.write(line.encode('UTF8'))
+            await writer.drain()
+        try:
+            await self.serve(reader.readline, write)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    async def report(self, every):
+        while True:
+            await asyncio.sleep(every)
+            self.printStats()
+
+
+    def printStats(self):
+        print(encodeLine(self.stats.report(self.queue.qsize() if self.queue else 0)), end='', file=sys.stderr, flush=True)
+
+
+    def close(self, loop):
+        for task in self.tasks:
+            task.cancel()
+        if self.tasks:
+            loop.run_until_complete(asyncio.wait(self.tasks))
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve Bridge and Torch solves as JSON lines.')
+    parser.add_argument('--port', type=int, default=None, help='listen on this port of --host instead of stdin')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--unix', default=None, help='listen on this Unix socket instead of stdin')
+    parser.add_argument('--workers', type=int, default=None, help='processes, the number of CPUs by default')
+    parser.add_argument('--max-queue', type=int, default=64, help='requests waiting before the input is not read')
+    parser.add_argument('--cache', default=None, help='SQLite file of a SolutionCache shared by the workers')
+    parser.add_argument('--time-limit', type=float, default=None, help='default seconds per solve')
+    parser.add_argument('--max-expansions', type=int, default=None, help='default expanded nodes per solve')
+    parser.add_argument('--report-every', type=float, default=None, help='seconds between two stats on stderr')
+    args = parser.parse_args(argv)
+
+    default_budget = {}
+    if args.time_limit is not None:
+        default_budget['time_limit'] = args.time_limit
+    if args.max_expansions is not None:
+        default_budget['max_expansions'] = args.max_expansions
+    service = Service(args.workers, args.max_queue, args.cache, default_budget)
+
+    async def run():
+        await service.start()
+        if args.report_every:
+            service.tasks.append(asyncio.ensure_future(service.report(args.report_every)))
+        if args.port is not None:
+            server = await asyncio.start_server(service.handleClient, args.host, args.port)
+        elif args.unix is not None:
+            server = await asyncio.start_unix_server(service.handleClient, args.unix)
+        else:
+            await service.serveStdin()
+            return
+        print(f'Serving on {args.unix or f"{args.host}:{args.port}"}', file=sys.stderr, flush=True)
+        async with server: # closed on the way out
+            await server.serve_forever() # until interrupted
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    main_task = loop.create_task(run())
+    try:
+        loop.run_until_complete(main_task)
+    except KeyboardInterrupt:
+        main_task.cancel() # leaves the server's context, which closes it
+        try:
+            loop.run_until_complete(main_task)
+        except asyncio.CancelledError:
+            pass
+    finally:
+        service.printStats()
+        service.close(loop)
+        loop.close()
+        if args.unix is not None and os.path.exists(args.unix) and stat.S_ISSOCK(os.stat(args.unix).st_mode):
+            os.unlink(args.unix) # the socket file outlives the server
+
+
+if __name__ == '__main__':
+    main()